@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark suite for FFmpegHelper operations
+
+Synthetic inputs are generated locally with lavfi (testsrc2 + sine) so every
+run sees identical media. Each case runs in its own worker process, which
+isolates the CPU time and peak RSS of the ffmpeg children it spawns, and
+starts with empty probe and keyframe caches.
+
+Usage:
+    python benchmark.py                         # full suite, results to benchmark_results.json
+    python benchmark.py --quick                 # small inputs only
+    python benchmark.py --only encode_video     # cases whose name contains a substring
+    python benchmark.py --baseline base.json    # compare against a stored run
+    python benchmark.py --save-baseline base.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# name -> lavfi generation parameters; encoded once and reused between runs
+INPUTS = {
+    "360p_h264_10s": {"kind": "video", "size": "640x360", "duration": 10, "codec": "libx264"},
+    "720p_h264_30s": {"kind": "video", "size": "1280x720", "duration": 30, "codec": "libx264"},
+    "1080p_h264_30s": {"kind": "video", "size": "1920x1080", "duration": 30, "codec": "libx264"},
+    "1080p_hevc_10s": {"kind": "video", "size": "1920x1080", "duration": 10, "codec": "libx265"},
+    # Longer than the default PARALLEL_MIN_DURATION so parallel presets take the segmented path
+    "720p_h264_360s": {"kind": "video", "size": "1280x720", "duration": 360, "codec": "libx264"},
+    # Constant 8 Mbit/s is above every preset's bitrate target, so encode_video can't stream-copy them
+    "360p_h264_8M_10s": {"kind": "video", "size": "640x360", "duration": 10, "codec": "libx264", "bitrate": "8M"},
+    "1080p_h264_8M_30s": {"kind": "video", "size": "1920x1080", "duration": 30, "codec": "libx264", "bitrate": "8M"},
+    "720p_h264_8M_360s": {"kind": "video", "size": "1280x720", "duration": 360, "codec": "libx264", "bitrate": "8M"},
+    "sine_30s": {"kind": "audio", "duration": 30},
+    "logo": {"kind": "image", "size": "320x120"},
+}
+
+# Frame rate of every synthetic video input
+INPUT_FPS = 30
+
+# Lower is better for these; fps and speed are higher-is-better
+COST_METRICS = ("wall", "cpu", "peak_rss")
+
+def ffmpeg_version() -> str:
+    try:
+        result = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True, timeout=10)
+        return result.stdout.splitlines()[0] if result.returncode == 0 else "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unavailable"
+
+def has_encoder(name: str) -> bool:
+    result = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True)
+    return any(line.split()[1:2] == [name] for line in result.stdout.splitlines())
+
+def build_cases(quick: bool, hevc: bool) -> list:
+    """Benchmark cases as plain dicts so they can be handed to a worker process"""
+    from config import Config
+
+    small = "360p_h264_10s"
+    medium = "720p_h264_30s"
+    large = small if quick else "1080p_h264_30s"
+    long = medium if quick else "720p_h264_360s"
+    videos = [small, medium] if quick else [small, medium, large, long]
+    # Sources that already fit a preset are stream-copied, which would measure a remux instead of an encode
+    encode_source = "360p_h264_8M_10s" if quick else "1080p_h264_8M_30s"
+
+    cases = []
+    for preset, settings in Config.VIDEO_PRESETS.items():
+        if settings.get("codec") == "libx265" and not hevc:
+            continue
+        cases.append({
+            "name": f"encode_video/{preset}/{encode_source}", "op": "encode_video",
+            "inputs": [encode_source], "preset": preset
+        })
+    if not quick:
+        cases.append({
+            "name": "encode_video/720p/720p_h264_8M_360s", "op": "encode_video",
+            "inputs": ["720p_h264_8M_360s"], "preset": "720p"
+        })
+        if hevc:
+            cases.append({
+                "name": "encode_video/720p/1080p_hevc_10s", "op": "encode_video",
+                "inputs": ["1080p_hevc_10s"], "preset": "720p"
+            })
+
+    # Identical inputs are stream-copied; mismatched ones go through normalization
+    cases.append({"name": "merge_videos/copy", "op": "merge_videos", "inputs": [small, small]})
+    cases.append({"name": "merge_videos/normalize", "op": "merge_videos", "inputs": [small, medium]})
+    cases.append({"name": f"merge_video_audio/{medium}", "op": "merge_video_audio", "inputs": [medium, "sine_30s"]})
+    for video in dict.fromkeys([medium, large]):
+        cases.append({"name": f"add_watermark/{video}", "op": "add_watermark", "inputs": [video, "logo"]})
+
+    start, duration = ("00:00:03", 5) if quick else ("00:00:17", 30)
+    cases.append({
+        "name": f"trim_video/{long}", "op": "trim_video", "inputs": [long], "start": start, "duration": duration,
+        # A smart cut that repeats or drops frames at its joins fails the case
+        "frames": duration * INPUT_FPS
+    })
+    cases.append({"name": f"generate_sample/{long}", "op": "generate_sample", "inputs": [long]})
+
+    for video in videos:
+        cases.append({"name": f"get_mediainfo_text/{video}", "op": "get_mediainfo_text", "inputs": [video]})
+        cases.append({"name": f"generate_thumbnail/{video}", "op": "generate_thumbnail", "inputs": [video]})
+    return cases
+
+def generate_input(name: str, directory: str) -> str:
+    """Encode a synthetic input with lavfi unless it already exists"""
+    spec = INPUTS[name]
+    ext = {"video": "mp4", "audio": "m4a", "image": "png"}[spec["kind"]]
+    path = os.path.join(directory, f"{name}.{ext}")
+    if os.path.exists(path):
+        return path
+
+    partial = os.path.join(directory, f"{name}.partial.{ext}")
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+    if spec["kind"] == "video":
+        duration = spec["duration"]
+        cmd += [
+            "-f", "lavfi", "-i", f"testsrc2=size={spec['size']}:rate={INPUT_FPS}:duration={duration}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:beep_factor=4:sample_rate=48000:duration={duration}",
+            "-map", "0:v", "-map", "1:a",
+            "-c:v", spec["codec"], "-preset", "veryfast", "-g", "60", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-b:a", "128k"
+        ]
+        if spec.get("bitrate"):
+            # Filler data keeps the bitrate constant even for the easy to compress test pattern
+            bitrate = spec["bitrate"]
+            cmd += ["-b:v", bitrate, "-minrate", bitrate, "-maxrate", bitrate, "-bufsize", bitrate]
+            cmd += ["-x264-params", "nal-hrd=cbr:force-cfr=1"]
+        if spec["codec"] == "libx265":
+            cmd += ["-x265-params", "log-level=error", "-tag:v", "hvc1"]
+    elif spec["kind"] == "audio":
+        cmd += [
+            "-f", "lavfi", "-i", f"sine=frequency=220:sample_rate=48000:duration={spec['duration']}",
+            "-c:a", "aac", "-b:a", "128k"
+        ]
+    else:
+        cmd += ["-f", "lavfi", "-i", f"testsrc2=size={spec['size']}:rate=1", "-frames:v", "1"]
+    # Bit-exact output and no metadata so inputs are identical across machines with the same ffmpeg
+    cmd += ["-fflags", "+bitexact", "-flags", "+bitexact", "-map_metadata", "-1", partial]
+
+    print(f"🎨 Generating {name}...")
+    subprocess.run(cmd, check=True)
+    os.replace(partial, path)
+    return path
+
+def count_frames(path: str) -> tuple:
+    """(video frames, duration in seconds) of an output file"""
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0", "-count_packets",
+        "-show_entries", "stream=nb_read_packets:format=duration", "-of", "json", path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return 0, 0.0
+    data = json.loads(result.stdout or "{}")
+    streams = data.get("streams") or [{}]
+    frames = int(streams[0].get("nb_read_packets", 0) or 0)
+    duration = float(data.get("format", {}).get("duration", 0) or 0)
+    return frames, duration
+
+async def run_operation(helper, presets: dict, case: dict, inputs: list, output_dir: str):
+    """Run one case through FFmpegHelper; returns (success, output path or None)"""
+    op = case["op"]
+    output = os.path.join(output_dir, "output.mp4")
+
+    if op == "encode_video":
+        ok = await helper.encode_video(inputs[0], output, dict(presets[case["preset"]]))
+    elif op == "merge_videos":
+        ok = await helper.merge_videos(inputs, output)
+    elif op == "merge_video_audio":
+        ok = await helper.merge_video_audio(inputs[0], inputs[1], output)
+    elif op == "add_watermark":
+        ok = await helper.add_watermark(inputs[0], inputs[1], output, case.get("position", "topright"))
+    elif op == "trim_video":
+        ok = await helper.trim_video(inputs[0], output, case["start"], str(case["duration"]))
+    elif op == "generate_sample":
+        ok = await helper.generate_sample(inputs[0], output, duration=case.get("duration", 30))
+    elif op == "get_mediainfo_text":
+        text = await helper.get_mediainfo_text(inputs[0])
+        return not text.startswith("❌"), None
+    elif op == "generate_thumbnail":
+        output = os.path.join(output_dir, "thumbnail.jpg")
+        ok = await helper.generate_thumbnail(inputs[0], output)
+    else:
+        raise ValueError(f"Unknown operation: {op}")
+    return ok, output
+
+def run_worker(case_path: str, result_path: str):
+    """Worker process: run a single case and write its measurements"""
+    with open(case_path) as f:
+        case = json.load(f)
+
+    # Scratch and keyframe index inside the run directory so nothing is shared between runs
+    os.environ["DOWNLOAD_DIR"] = case["output_dir"]
+    os.environ["KEYFRAME_INDEX_DIR"] = os.path.join(case["output_dir"], ".keyframes")
+    sys.path.insert(0, ROOT)
+    from config import Config
+    from bot.helpers.ffmpeg_helper import FFmpegHelper
+
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    ok, output = asyncio.run(run_operation(FFmpegHelper, Config.VIDEO_PRESETS, case, case["paths"], case["output_dir"]))
+    wall = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    result = {
+        "ok": bool(ok),
+        "wall": wall,
+        "cpu": (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime),
+        # Largest resident set of any ffmpeg/ffprobe child; ru_maxrss is in KiB on Linux
+        "peak_rss": after.ru_maxrss * 1024,
+        "fps": None,
+        "speed": None
+    }
+    if ok and output and output.endswith(".mp4") and os.path.exists(output):
+        frames, duration = count_frames(output)
+        result["fps"] = frames / wall if wall > 0 and frames else None
+        result["speed"] = duration / wall if wall > 0 and duration else None
+        if case.get("frames") and frames != case["frames"]:
+            print(f"❌ {case['name']}: {frames} frames, expected {case['frames']}")
+            result["ok"] = False
+
+    # Record whether the encode transcoded or stream-copied so a changed plan isn't read as a speedup
+    if case["op"] == "encode_video":
+        descriptor = asyncio.run(FFmpegHelper.probe(case["paths"][0]))
+        plan = FFmpegHelper.plan_encode(descriptor, Config.VIDEO_PRESETS[case["preset"]])
+        result["plan"] = f"{plan['video']} ({plan['video_reason']})"
+
+    with open(result_path, "w") as f:
+        json.dump(result, f)
+
+def run_case(case: dict, paths: dict, workdir: str, repeat: int) -> dict:
+    """Run a case repeat times in fresh worker processes and aggregate the runs"""
+    runs = []
+    for _ in range(repeat):
+        run_dir = tempfile.mkdtemp(prefix="run_", dir=workdir)
+        try:
+            case_path = os.path.join(run_dir, "case.json")
+            result_path = os.path.join(run_dir, "result.json")
+            with open(case_path, "w") as f:
+                json.dump({**case, "paths": [paths[name] for name in case["inputs"]], "output_dir": run_dir}, f)
+
+            process = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", case_path, result_path],
+                cwd=ROOT, capture_output=True, text=True
+            )
+            if process.returncode != 0 or not os.path.exists(result_path):
+                print(process.stdout[-1000:] + process.stderr[-1000:])
+                runs.append({"ok": False})
+                continue
+            with open(result_path) as f:
+                runs.append(json.load(f))
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    good = [run for run in runs if run.get("ok")]
+    summary = {"ok": len(good) == len(runs), "runs": len(runs)}
+    plans = [run["plan"] for run in runs if run.get("plan")]
+    if plans:
+        summary["plan"] = plans[0]
+    if not good:
+        return summary
+
+    def median(key):
+        values = [run[key] for run in good if run.get(key) is not None]
+        return statistics.median(values) if values else None
+
+    summary.update({
+        "wall": median("wall"),
+        "wall_min": min(run["wall"] for run in good),
+        "wall_max": max(run["wall"] for run in good),
+        "cpu": median("cpu"),
+        "peak_rss": max(run["peak_rss"] for run in good),
+        "fps": median("fps"),
+        "speed": median("speed")
+    })
+    return summary
+
+def environment() -> dict:
+    """Everything that affects results besides the code under test"""
+    from config import Config
+
+    return {
+        "ffmpeg": ffmpeg_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg_threads": Config.FFMPEG_THREADS,
+        "ffmpeg_max_jobs": Config.FFMPEG_MAX_JOBS,
+        "parallel_min_duration": Config.PARALLEL_MIN_DURATION
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print deltas against a baseline and return the names of regressed cases"""
+    base_env = baseline.get("environment", {})
+    for key, value in results["environment"].items():
+        if key in base_env and base_env[key] != value:
+            print(f"⚠️  Baseline {key} differs: {base_env[key]} → {value}")
+
+    regressions = []
+    print(f"\n{'Case':<48} {'Wall':>14} {'CPU':>14} {'Peak RSS':>14}")
+    for name, current in results["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if not previous or not current.get("ok") or not previous.get("ok"):
+            continue
+        if previous.get("plan") != current.get("plan"):
+            print(f"⚠️  {name} encode plan changed: {previous.get('plan')} → {current.get('plan')}")
+
+        cells = []
+        regressed = False
+        for metric in COST_METRICS:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                cells.append(f"{'-':>14}")
+                continue
+            delta = (new - old) / old
+            regressed |= delta > threshold
+            cells.append(f"{delta * 100:>+13.1f}%")
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<48} {' '.join(cells)}{'  ❌' if regressed else ''}")
+    return regressions
+
+def print_results(results: dict):
+    print(f"\n{'Case':<48} {'Wall':>9} {'CPU':>9} {'RSS MiB':>9} {'FPS':>9} {'Speed':>7}")
+    for name, case in results["cases"].items():
+        if not case.get("ok"):
+            print(f"{name:<48} ❌ failed")
+            continue
+        fps = f"{case['fps']:.1f}" if case.get("fps") else "-"
+        speed = f"{case['speed']:.2f}x" if case.get("speed") else "-"
+        print(
+            f"{name:<48} {case['wall']:>8.2f}s {case['cpu']:>8.2f}s "
+            f"{case['peak_rss'] / 1048576:>9.1f} {fps:>9} {speed:>7}"
+        )
+        if case.get("plan"):
+            print(f"{'':<48} video {case['plan']}")
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description="Benchmark FFmpegHelper operations on synthetic inputs")
+    parser.add_argument("--quick", action="store_true", help="only small inputs")
+    parser.add_argument("--only", action="append", default=[], help="run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case (median is reported)")
+    parser.add_argument("--workdir", default=os.path.join(ROOT, "bench_data"), help="where inputs are cached")
+    parser.add_argument("--output", default="benchmark_results.json", help="results JSON path")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="also write the results as a new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown counted as a regression")
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return True
+
+    sys.path.insert(0, ROOT)
+    if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+        print("❌ FFmpeg not found")
+        return False
+
+    cases = build_cases(args.quick, has_encoder("libx265"))
+    if args.only:
+        cases = [case for case in cases if any(part in case["name"] for part in args.only)]
+    if not cases:
+        print("❌ No cases selected")
+        return False
+
+    input_dir = os.path.join(args.workdir, "inputs")
+    os.makedirs(input_dir, exist_ok=True)
+    needed = dict.fromkeys(name for case in cases for name in case["inputs"])
+    paths = {name: generate_input(name, input_dir) for name in needed}
+
+    results = {
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "environment": environment(),
+        "inputs": {name: INPUTS[name] for name in needed},
+        "cases": {}
+    }
+    for i, case in enumerate(cases, 1):
+        print(f"⏱️  [{i}/{len(cases)}] {case['name']}")
+        results["cases"][case["name"]] = run_case(case, paths, args.workdir, max(1, args.repeat))
+
+    print_results(results)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline written to {args.save_baseline}")
+
+    success = all(case.get("ok") for case in results["cases"].values())
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+            success = False
+        else:
+            print("\n✅ No regressions against baseline")
+    return success
+
+if __name__ == "__main__":
+    try:
+        sys.exit(0 if main() else 1)
+    except KeyboardInterrupt:
+        print("\n\nBenchmark interrupted by user.")
+        sys.exit(1)
@@ -1,5 +1,8 @@
 from pyrogram import Client
 from config import Config
+from bot.helpers.http_client import http_client
+from bot.helpers.metrics import metrics_server
+from bot.helpers.workspace import workspace_manager
 
 class Bot(Client):
     def __init__(self):
@@ -12,11 +15,19 @@ class Bot(Client):
         )
 
     async def start(self):
+        # Nothing is running yet, so every workspace on disk is left over from a previous run
+        removed = workspace_manager.sweep()
+        if removed:
+            print(f"🧹 Removed {removed} orphaned workspaces")
         await super().start()
+        await http_client.start()
+        await metrics_server.start()
         me = await self.get_me()
         print(f"✅ Bot Started as @{me.username}")
 
     async def stop(self):
+        await metrics_server.stop()
+        await http_client.close()
         await super().stop()
         print("🛑 Bot Stopped")
         
@@ -1,15 +1,30 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from config import Config
 from typing import Dict, Optional, List
 from datetime import datetime
+from bot.helpers.metrics import mongo_latency
+
+class CommandTimer(monitoring.CommandListener):
+    """Feeds the latency of every MongoDB command into the metrics registry"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_latency.observe(event.duration_micros / 1e6, command=event.command_name, status="ok")
+
+    def failed(self, event):
+        mongo_latency.observe(event.duration_micros / 1e6, command=event.command_name, status="error")
 
 class Database:
     def __init__(self):
-        self.client = AsyncIOMotorClient(Config.MONGO_URI)
+        self.client = AsyncIOMotorClient(Config.MONGO_URI, event_listeners=[CommandTimer()])
         self.db = self.client[Config.DATABASE_NAME]
         self.users = self.db.users
         self.tasks = self.db.tasks
         self.groups = self.db.groups
+        self.results = self.db.results
 
     async def add_user(self, user_id: int, username: str = None):
         """Add a new user or update existing user"""
@@ -38,6 +53,7 @@ class Database:
                 "temp_files": [],
                 "watermark_position": "topright",
                 "trim_settings": None,
+                "screenshot_settings": None,
                 "created_at": datetime.utcnow(),
                 "last_used": datetime.utcnow()
             }
@@ -108,6 +124,13 @@ class Database:
             {"$set": {"trim_settings": settings, "last_used": datetime.utcnow()}}
         )
 
+    async def set_screenshot_settings(self, user_id: int, settings: Dict):
+        """Set screenshot settings for user"""
+        await self.users.update_one(
+            {"user_id": user_id},
+            {"$set": {"screenshot_settings": settings, "last_used": datetime.utcnow()}}
+        )
+
     async def add_temp_file(self, user_id: int, file_info: Dict):
         """Add temporary file to user's collection"""
         await self.users.update_one(
@@ -164,6 +187,26 @@ class Database:
             {"$set": {"status": "completed", "completed_at": datetime.utcnow()}}
         )
 
+    async def save_task_timeline(self, task_id: str, timeline: Dict):
+        """Store a finished task's stage spans"""
+        from bson import ObjectId
+        await self.tasks.update_one(
+            {"_id": ObjectId(task_id)},
+            {"$set": {"timeline": timeline}}
+        )
+
+    async def get_task(self, task_id: str) -> Optional[Dict]:
+        """Get a task by id"""
+        from bson import ObjectId
+        return await self.tasks.find_one({"_id": ObjectId(task_id)})
+
+    async def get_slowest_tasks(self, since: datetime, limit: int = 10) -> List[Dict]:
+        """Get tasks started since a time with a recorded timeline, slowest first"""
+        cursor = self.tasks.find(
+            {"started_at": {"$gte": since}, "timeline": {"$exists": True}}
+        ).sort("timeline.duration", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
     async def cancel_task(self, user_id: int):
         """Cancel user's active task"""
         await self.tasks.update_many(
@@ -171,6 +214,22 @@ class Database:
             {"$set": {"status": "cancelled", "completed_at": datetime.utcnow()}}
         )
 
+    async def get_cached_result(self, key: str) -> Optional[Dict]:
+        """Get a previously uploaded output by result key"""
+        return await self.results.find_one({"key": key})
+
+    async def save_cached_result(self, key: str, file_id: str):
+        """Remember the Telegram file_id of an uploaded output"""
+        await self.results.update_one(
+            {"key": key},
+            {"$set": {"file_id": file_id, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def delete_cached_result(self, key: str):
+        """Forget a cached output whose file_id no longer works"""
+        await self.results.delete_one({"key": key})
+
     async def is_group_authorized(self, group_id: int) -> bool:
         """Check if group is authorized"""
         return group_id in Config.AUTHORIZED_GROUPS
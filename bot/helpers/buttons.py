@@ -55,6 +55,9 @@ def video_tools_buttons():
         ],
         [
             InlineKeyboardButton("📊 MediaInfo", callback_data="tool_mediainfo"),
+            InlineKeyboardButton("📸 Screenshots", callback_data="tool_screenshots")
+        ],
+        [
             InlineKeyboardButton("🔙 Main Menu", callback_data="main_menu")
         ]
     ])
@@ -91,12 +94,32 @@ def encoding_quality_buttons():
             InlineKeyboardButton("360p", callback_data="quality_360p"),
             InlineKeyboardButton("⚙️ Custom", callback_data="quality_custom")
         ],
+        [
+            InlineKeyboardButton("📶 Multi Quality", callback_data="quality_ladder")
+        ],
         [
             InlineKeyboardButton("🔙 Video Tools", callback_data="video_tools"),
             InlineKeyboardButton("🔙 Main Menu", callback_data="main_menu")
         ]
     ])
 
+def ladder_quality_buttons(selected: list):
+    """Multi quality selection buttons - 2 column layout"""
+    names = ["1080p", "1080p_hevc", "720p", "720p_hevc", "480p", "480p_hevc", "360p"]
+    buttons = [
+        InlineKeyboardButton(
+            f"{'✅' if name in selected else '⭕'} {name.replace('_hevc', ' HEVC')}",
+            callback_data=f"ladder_{name}"
+        )
+        for name in names
+    ]
+    rows = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    rows.append([
+        InlineKeyboardButton("✅ Done", callback_data="ladder_done"),
+        InlineKeyboardButton("🔙 Quality Selection", callback_data="tool_encoding")
+    ])
+    return InlineKeyboardMarkup(rows)
+
 def encoding_settings_buttons():
     """Encoding settings configuration buttons - 2 column layout"""
     return InlineKeyboardMarkup([
@@ -135,6 +158,19 @@ def watermark_position_buttons():
         ]
     ])
 
+def screenshot_buttons():
+    """Screenshot mode selection - 2 column layout"""
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("🖼️ Screenshots", callback_data="ss_interval"),
+            InlineKeyboardButton("🗂️ Contact Sheet", callback_data="ss_sheet")
+        ],
+        [
+            InlineKeyboardButton("🎬 Scene Changes", callback_data="ss_scene"),
+            InlineKeyboardButton("🔙 Video Tools", callback_data="video_tools")
+        ]
+    ])
+
 def send_as_buttons(current: str):
     """Send as document/video selection - 2 column layout"""
     return InlineKeyboardMarkup([
@@ -1,21 +1,42 @@
 import os
-import aiohttp
+import json
+import asyncio
 import aiofiles
 from pyrogram.types import Message
 from pyrogram import Client
 from config import Config
 import time
+from typing import Optional
 from bot.utils.helpers import format_size, format_time
+from bot.helpers.http_client import http_client
+from bot.helpers.metrics import observe_transfer
+from bot.helpers.timeline import record_span
+
+class RangeIgnoredError(Exception):
+    """Server answered a ranged request with the whole file"""
+
+class FileTooLargeError(Exception):
+    """A URL download grew past its size limit"""
 
 class DownloadHelper:
+    # pyrogram streams media in fixed 1 MB chunks
+    CHUNK_SIZE = 1024 * 1024
+    # A trailing moov may take up to this many times the head budget
+    TAIL_CHUNKS_FACTOR = 4
+
     @staticmethod
-    async def download_telegram_file(client: Client, message: Message, file_path: str, status_msg=None):
+    async def download_telegram_file(client: Client, message: Message, file_path: str, status_msg=None,
+                                     on_progress=None):
         """Download file from Telegram with progress tracking"""
         try:
             start_time = time.time()
             last_update = [0]
 
             async def progress(current, total):
+                if on_progress:
+                    await on_progress(current, total)
+                    return
+
                 percentage = (current / total) * 100
                 elapsed = time.time() - start_time
                 speed = current / (elapsed if elapsed > 0 else 1)
@@ -46,52 +67,387 @@ class DownloadHelper:
             else:
                 return None
 
+            observe_transfer("download", "telegram", time.time() - start_time, os.path.getsize(file_path))
+            record_span("download", start_time, endpoint="telegram", bytes=os.path.getsize(file_path))
             return file_path
         except Exception as e:
             print(f"Error downloading from Telegram: {e}")
+            observe_transfer("download", "telegram", 0, 0, success=False)
+            record_span("download", start_time, endpoint="telegram", ok=False)
+            return None
+
+    @staticmethod
+    async def download_telegram_files(client: Client, downloads: list, status_msg=None) -> list:
+        """Download several (message, file_path) pairs concurrently with one combined progress view"""
+        semaphore = asyncio.Semaphore(max(1, Config.DOWNLOAD_CONCURRENCY))
+        progress = []
+        for message, _ in downloads:
+            media = message.video or message.document or message.audio or message.photo
+            progress.append([0, getattr(media, "file_size", 0) or 0])
+
+        start_time = time.time()
+        last_update = [0]
+
+        async def render():
+            if not status_msg or (time.time() - last_update[0]) <= 2:
+                return
+            last_update[0] = time.time()
+
+            current = sum(p[0] for p in progress)
+            total = sum(p[1] for p in progress) or 1
+            elapsed = time.time() - start_time
+            speed = current / (elapsed if elapsed > 0 else 1)
+            eta = (total - current) / speed if speed > 0 else 0
+
+            progress_text = (
+                f"⏬ **Downloading {len(downloads)} files from TG...**\n\n"
+                f"📊 Progress: {current * 100 / total:.1f}%\n"
+                f"📦 Size: {format_size(current)} / {format_size(total)}\n"
+                f"⚡ Speed: {format_size(speed)}/s\n"
+                f"⏰ ETA: {format_time(eta)}\n\n"
+            )
+            for i, (done, size) in enumerate(progress, 1):
+                progress_text += f"{i}. {done * 100 / size if size else 0:.0f}%\n"
+            try:
+                await status_msg.edit_text(progress_text)
+            except:
+                pass
+
+        async def download(i, message, file_path):
+            async def on_progress(current, total):
+                progress[i] = [current, total]
+                await render()
+
+            async with semaphore:
+                return await DownloadHelper.download_telegram_file(
+                    client, message, file_path, on_progress=on_progress
+                )
+
+        return await asyncio.gather(*(
+            download(i, message, file_path) for i, (message, file_path) in enumerate(downloads)
+        ))
+
+    @staticmethod
+    async def stream_telegram_file(client: Client, message: Message, status_msg=None, limit: int = 0):
+        """Yield a Telegram file in 1 MB chunks as it arrives"""
+        media = message.video or message.document or message.audio
+        if not media:
+            return
+
+        total = media.file_size or 0
+        start_time = time.time()
+        last_update = [0]
+        current = 0
+
+        async for chunk in client.stream_media(message, limit=limit):
+            current += len(chunk)
+
+            if status_msg and total and (time.time() - last_update[0]) > 2:
+                last_update[0] = time.time()
+                elapsed = time.time() - start_time
+                speed = current / (elapsed if elapsed > 0 else 1)
+                eta = (total - current) / speed if speed > 0 else 0
+                progress_text = (
+                    f"⏬ **Streaming from TG...**\n\n"
+                    f"📊 Progress: {current * 100 / total:.1f}%\n"
+                    f"📦 Size: {format_size(current)} / {format_size(total)}\n"
+                    f"⚡ Speed: {format_size(speed)}/s\n"
+                    f"⏰ ETA: {format_time(eta)}"
+                )
+                try:
+                    await status_msg.edit_text(progress_text)
+                except:
+                    pass
+
+            yield chunk
+
+    @staticmethod
+    def _mp4_tail_offset(head: bytes, total: int) -> Optional[int]:
+        """Offset of the first top-level MP4 box past the fetched head when moov isn't in it"""
+        if head[4:8] != b"ftyp":
+            return None
+
+        offset = 0
+        while offset + 8 <= len(head):
+            size = int.from_bytes(head[offset:offset + 4], "big")
+            if head[offset + 4:offset + 8] == b"moov":
+                return None
+            if size == 1:
+                if offset + 16 > len(head):
+                    break
+                size = int.from_bytes(head[offset + 8:offset + 16], "big")
+            elif size == 0:
+                # Box runs to the end of the file, nothing can follow it
+                return None
+            if size < 8:
+                return None
+            offset += size
+
+        return offset if offset < total else None
+
+    @staticmethod
+    def head_size(head_chunks: int, total: int) -> int:
+        """Most bytes download_telegram_head writes to disk for a file of total bytes"""
+        return min(total, head_chunks * (1 + DownloadHelper.TAIL_CHUNKS_FACTOR) * DownloadHelper.CHUNK_SIZE)
+
+    @staticmethod
+    async def download_telegram_head(client: Client, message: Message, file_path: str, head_chunks: int = 16):
+        """Fetch only the leading chunks (plus a trailing moov atom for MP4) into a sparse file for probing"""
+        try:
+            media = message.video or message.document or message.audio
+            if not media:
+                return None
+            total = media.file_size or 0
+
+            head = b"".join([chunk async for chunk in client.stream_media(message, limit=head_chunks)])
+
+            async with aiofiles.open(file_path, 'wb') as f:
+                await f.truncate(total)
+                await f.write(head)
+
+                tail_offset = DownloadHelper._mp4_tail_offset(head, total)
+                if tail_offset is not None:
+                    # Never pull more than the head budget again for the tail
+                    start_chunk = tail_offset // DownloadHelper.CHUNK_SIZE
+                    tail_budget = head_chunks * DownloadHelper.TAIL_CHUNKS_FACTOR * DownloadHelper.CHUNK_SIZE
+                    if total - start_chunk * DownloadHelper.CHUNK_SIZE > tail_budget:
+                        return None
+
+                    await f.seek(start_chunk * DownloadHelper.CHUNK_SIZE)
+                    async for chunk in client.stream_media(message, offset=start_chunk):
+                        await f.write(chunk)
+
+            return file_path
+        except Exception as e:
+            print(f"Error fetching file header from Telegram: {e}")
+            return None
+
+    @staticmethod
+    async def _probe_url(url: str):
+        """Return (size, etag, supports_ranges) for a URL using a one-byte range request"""
+        async with http_client.session.get(url, headers={"Range": "bytes=0-0"}) as response:
+            if response.status == 206:
+                content_range = response.headers.get("Content-Range", "")
+                total = content_range.rpartition("/")[2]
+                if total.isdigit():
+                    return int(total), response.headers.get("ETag", ""), True
+            if response.status in (200, 206):
+                return int(response.headers.get("Content-Length", 0)), response.headers.get("ETag", ""), False
+            return None, None, False
+
+    @staticmethod
+    def _load_part_state(state_path: str, url: str, size: int, etag: str, file_path: str) -> Optional[dict]:
+        """Load resume state if it still matches the remote file and the data file on disk"""
+        try:
+            with open(state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != url or state.get("size") != size or state.get("etag") != etag:
+            return None
+        if not os.path.exists(file_path) or os.path.getsize(file_path) != size:
             return None
+        return state
 
     @staticmethod
-    async def download_from_url(url: str, file_path: str, status_msg=None):
-        """Download file from URL with progress tracking"""
+    def _save_part_state(state_path: str, state: dict):
+        tmp_path = f"{state_path}.tmp"
         try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, state_path)
+        except OSError as e:
+            print(f"Error saving download state: {e}")
+
+    @staticmethod
+    async def download_from_url(url: str, file_path: str, status_msg=None, max_size: int = 0):
+        """Download file from URL in parallel ranged segments, resuming from a .part state file"""
+        state_path = f"{file_path}.part"
+        try:
+            size, etag, supports_ranges = await DownloadHelper._probe_url(url)
+            if size is None:
+                observe_transfer("download", "url", 0, 0, success=False)
+                return None
+            if max_size and size > max_size:
+                print(f"Refusing URL download of {format_size(size)}, limit is {format_size(max_size)}")
+                return None
+            if not supports_ranges or size < Config.URL_SEGMENT_MIN_SIZE:
+                return await DownloadHelper._download_single_stream(url, file_path, status_msg, max_size)
+
+            state = DownloadHelper._load_part_state(state_path, url, size, etag, file_path)
+            if state is None:
+                count = max(1, min(Config.URL_SEGMENTS, size // Config.URL_SEGMENT_MIN_SIZE))
+                step = -(-size // count)
+                state = {
+                    "url": url,
+                    "size": size,
+                    "etag": etag,
+                    # [start, end inclusive, bytes done]
+                    "segments": [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+                }
+                # Preallocate (sparse) so every segment can write at its own offset
+                with open(file_path, "wb") as f:
+                    f.truncate(size)
+                DownloadHelper._save_part_state(state_path, state)
+
             start_time = time.time()
+            resumed = sum(segment[2] for segment in state["segments"])
             last_update = [0]
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        return None
+            async def report():
+                if (time.time() - last_update[0]) <= 2:
+                    return
+                last_update[0] = time.time()
+                DownloadHelper._save_part_state(state_path, state)
+                if not status_msg:
+                    return
+
+                downloaded = sum(segment[2] for segment in state["segments"])
+                percentage = (downloaded / size) * 100
+                elapsed = time.time() - start_time
+                speed = (downloaded - resumed) / (elapsed if elapsed > 0 else 1)
+                eta = (size - downloaded) / speed if speed > 0 else 0
+
+                progress_text = (
+                    f"⏬ **Downloading from URL...**\n\n"
+                    f"📊 Progress: {percentage:.1f}%\n"
+                    f"📦 Size: {format_size(downloaded)} / {format_size(size)}\n"
+                    f"⚡ Speed: {format_size(speed)}/s\n"
+                    f"🧩 Segments: {len(state['segments'])}\n"
+                    f"⏰ ETA: {format_time(eta)}"
+                )
+                try:
+                    await status_msg.edit_text(progress_text)
+                except:
+                    pass
+
+            async def fetch_segment(segment):
+                retries = 0
+                while segment[0] + segment[2] <= segment[1]:
+                    offset = segment[0] + segment[2]
+                    headers = {"Range": f"bytes={offset}-{segment[1]}"}
+                    # If-Range only accepts strong validators, a weak one makes servers send the whole file
+                    if etag and not etag.startswith("W/"):
+                        headers["If-Range"] = etag
+                    try:
+                        async with http_client.session.get(url, headers=headers) as response:
+                            if response.status == 200:
+                                raise RangeIgnoredError(f"Range request for {url} returned the whole file")
+                            if response.status != 206:
+                                raise ValueError(f"Range request returned HTTP {response.status}")
+
+                            async with aiofiles.open(file_path, "r+b") as f:
+                                await f.seek(offset)
+                                async for chunk in response.content.iter_chunked(http_client.chunk_size):
+                                    chunk = chunk[:segment[1] - (segment[0] + segment[2]) + 1]
+                                    await f.write(chunk)
+                                    segment[2] += len(chunk)
+                                    retries = 0
+                                    if max_size and sum(part[2] for part in state["segments"]) > max_size:
+                                        raise FileTooLargeError(f"URL download exceeded {format_size(max_size)}")
+                                    await report()
+
+                            if segment[2] == offset - segment[0]:
+                                raise ConnectionError("Range request returned no data")
+                    except (ValueError, RangeIgnoredError, FileTooLargeError):
+                        raise
+                    except Exception as e:
+                        retries += 1
+                        if retries > Config.URL_SEGMENT_RETRIES:
+                            raise
+                        print(f"Segment {segment[0]}-{segment[1]} failed ({e}), retrying")
+                        await asyncio.sleep(2 ** retries)
+
+            tasks = [asyncio.create_task(fetch_segment(segment)) for segment in state["segments"]]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            finally:
+                # Keep progress so the next attempt resumes where this one stopped
+                DownloadHelper._save_part_state(state_path, state)
+
+            os.remove(state_path)
+            observe_transfer("download", "url", time.time() - start_time, size - resumed)
+            record_span("download", start_time, endpoint="url", bytes=size - resumed, segments=len(state["segments"]))
+            return file_path
+        except RangeIgnoredError as e:
+            # The file changed or the server stopped honouring ranges, start over with one plain GET
+            print(f"{e}, downloading it in one stream")
+            try:
+                os.remove(state_path)
+            except OSError:
+                pass
+            return await DownloadHelper._download_single_stream(url, file_path, status_msg, max_size)
+        except Exception as e:
+            print(f"Error downloading from URL: {e}")
+            observe_transfer("download", "url", 0, 0, success=False)
+            if isinstance(e, FileTooLargeError):
+                # Nothing worth resuming once the file is known to be over the limit
+                for path in (file_path, state_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            return None
+
+    @staticmethod
+    async def _download_single_stream(url: str, file_path: str, status_msg=None, max_size: int = 0):
+        """Download file from URL in one GET with progress tracking, stopping once it exceeds max_size"""
+        try:
+            start_time = time.time()
+            last_update = [0]
+
+            async with http_client.session.get(url) as response:
+                if response.status != 200:
+                    observe_transfer("download", "url", 0, 0, success=False)
+                    return None
+
+                total_size = int(response.headers.get('content-length', 0))
+                downloaded = 0
+                if max_size and total_size > max_size:
+                    raise FileTooLargeError(f"URL download of {format_size(total_size)} exceeds {format_size(max_size)}")
+
+                async with aiofiles.open(file_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(http_client.chunk_size):
+                        await f.write(chunk)
+                        downloaded += len(chunk)
+                        # Chunked responses have no Content-Length, so the limit is enforced on what arrives
+                        if max_size and downloaded > max_size:
+                            raise FileTooLargeError(f"URL download exceeded {format_size(max_size)}")
 
-                    total_size = int(response.headers.get('content-length', 0))
-                    downloaded = 0
-
-                    async with aiofiles.open(file_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            await f.write(chunk)
-                            downloaded += len(chunk)
-
-                            if status_msg and total_size > 0 and (time.time() - last_update[0]) > 2:
-                                last_update[0] = time.time()
-                                percentage = (downloaded / total_size) * 100
-                                elapsed = time.time() - start_time
-                                speed = downloaded / (elapsed if elapsed > 0 else 1)
-                                eta = (total_size - downloaded) / speed if speed > 0 else 0
-                                
-                                progress_text = (
-                                    f"⏬ **Downloading from URL...**\n\n"
-                                    f"📊 Progress: {percentage:.1f}%\n"
-                                    f"📦 Size: {format_size(downloaded)} / {format_size(total_size)}\n"
-                                    f"⚡ Speed: {format_size(speed)}/s\n"
-                                    f"⏰ ETA: {format_time(eta)}"
-                                )
-                                try:
-                                    await status_msg.edit_text(progress_text)
-                                except:
-                                    pass
+                        if status_msg and total_size > 0 and (time.time() - last_update[0]) > 2:
+                            last_update[0] = time.time()
+                            percentage = (downloaded / total_size) * 100
+                            elapsed = time.time() - start_time
+                            speed = downloaded / (elapsed if elapsed > 0 else 1)
+                            eta = (total_size - downloaded) / speed if speed > 0 else 0
+                            
+                            progress_text = (
+                                f"⏬ **Downloading from URL...**\n\n"
+                                f"📊 Progress: {percentage:.1f}%\n"
+                                f"📦 Size: {format_size(downloaded)} / {format_size(total_size)}\n"
+                                f"⚡ Speed: {format_size(speed)}/s\n"
+                                f"⏰ ETA: {format_time(eta)}"
+                            )
+                            try:
+                                await status_msg.edit_text(progress_text)
+                            except:
+                                pass
 
+            observe_transfer("download", "url", time.time() - start_time, downloaded)
+            record_span("download", start_time, endpoint="url", bytes=downloaded)
             return file_path
         except Exception as e:
             print(f"Error downloading from URL: {e}")
+            observe_transfer("download", "url", 0, 0, success=False)
+            if isinstance(e, FileTooLargeError):
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
             return None
                     
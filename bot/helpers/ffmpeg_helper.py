@@ -1,22 +1,173 @@
 import asyncio
 import os
+import shutil
 import subprocess
 import json
-import re
+import math
+import time
+import uuid
+from array import array
+from collections import Counter
 from typing import Dict, Optional
 from config import Config
+from bot.helpers.keyframe_index import KeyframeIndex, keyframe_store
+from bot.helpers.metrics import ffmpeg_duration, ffmpeg_failures, ffmpeg_fps, ffmpeg_processes, ffmpeg_queue_wait, ffmpeg_speed
+from bot.helpers.probe_cache import MediaDescriptor, probe_cache
+from bot.helpers.progress import ProgressEvent, current_task_id, progress_bus
+from bot.helpers.scheduler import ffmpeg_scheduler
+from bot.helpers.timeline import record_span
 
 class FFmpegHelper:
+    # Encoders that produce streams compatible with the source codec for smart-cut trimming
+    SMART_CUT_ENCODERS = {
+        "h264": "libx264",
+        "hevc": "libx265"
+    }
+
+    # Encoder profile for each profile name ffprobe reports, per smart-cut codec
+    SMART_CUT_PROFILES = {
+        "h264": {
+            "Constrained Baseline": "baseline",
+            "Baseline": "baseline",
+            "Main": "main",
+            "High": "high",
+            "High 10": "high10",
+            "High 4:2:2": "high422",
+            "High 4:4:4 Predictive": "high444"
+        },
+        "hevc": {
+            "Main": "main",
+            "Main 10": "main10"
+        }
+    }
+
+    # Codec names ffprobe reports for the output of each encoder
+    ENCODER_CODECS = {
+        "libx264": "h264",
+        "libx265": "hevc",
+        "aac": "aac",
+        "libopus": "opus",
+        "libmp3lame": "mp3"
+    }
+
+    # Audio encoders for each codec name ffprobe reports
+    AUDIO_ENCODERS = {
+        "aac": "aac",
+        "opus": "libopus",
+        "mp3": "libmp3lame"
+    }
+
+    @staticmethod
+    async def probe(file_path: str, file_unique_id: str = None, read_packets: bool = True) -> Optional[MediaDescriptor]:
+        """Get parsed media descriptor, served from the probe cache when possible"""
+        descriptor = probe_cache.get(file_path, file_unique_id)
+        if descriptor:
+            return descriptor
+
+        try:
+            started_at = time.time()
+            cmd = ["ffprobe", "-v", "quiet", "-print_format", "json"]
+            if read_packets:
+                cmd.extend(["-show_entries", "format:stream:packet=stream_index,pts_time,flags", "-read_intervals", "%+30"])
+            else:
+                cmd.extend(["-show_format", "-show_streams"])
+            cmd.append(file_path)
+
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+
+            stdout, stderr = await process.communicate()
+            record_span("probe", started_at, ok=process.returncode == 0)
+            if process.returncode != 0:
+                return None
+
+            descriptor = MediaDescriptor.from_ffprobe(json.loads(stdout.decode()), file_path)
+            probe_cache.put(file_path, descriptor, file_unique_id)
+            return descriptor
+        except Exception as e:
+            print(f"Error probing file: {e}")
+            return None
+
     @staticmethod
-    async def get_video_info(file_path: str) -> Optional[Dict]:
+    async def get_video_info(file_path: str, file_unique_id: str = None) -> Optional[Dict]:
         """Get video information using ffprobe"""
+        descriptor = await FFmpegHelper.probe(file_path, file_unique_id)
+        return descriptor.raw if descriptor else None
+
+    @staticmethod
+    async def _feed_stdin(process, chunks):
+        """Write an async chunk iterator into a process's stdin until either side is done"""
+        try:
+            async for chunk in chunks:
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            await chunks.aclose()
+            try:
+                process.stdin.close()
+            except:
+                pass
+
+    @staticmethod
+    async def probe_stream(chunks) -> Optional[MediaDescriptor]:
+        """Probe media from an async chunk iterator, stopping the stream once ffprobe has the header"""
         try:
+            started_at = time.time()
             cmd = [
                 "ffprobe",
                 "-v", "quiet",
                 "-print_format", "json",
                 "-show_format",
                 "-show_streams",
+                "-i", "pipe:0"
+            ]
+
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            feeder = asyncio.create_task(FFmpegHelper._feed_stdin(process, chunks))
+
+            try:
+                stdout, _ = await asyncio.gather(process.stdout.read(), process.stderr.read())
+                await process.wait()
+            finally:
+                feeder.cancel()
+
+            record_span("probe", started_at, endpoint="stream", ok=process.returncode == 0)
+            if process.returncode != 0:
+                return None
+
+            data = json.loads(stdout.decode())
+            if not data.get("streams"):
+                return None
+            return MediaDescriptor.from_ffprobe(data, "pipe:0")
+        except Exception as e:
+            print(f"Error probing stream: {e}")
+            return None
+
+    @staticmethod
+    async def get_keyframe_index(file_path: str, file_unique_id: str = None) -> Optional[KeyframeIndex]:
+        """Get the video keyframe index, building it with one packet scan on a miss"""
+        index = keyframe_store.get(file_path, file_unique_id)
+        if index is not None:
+            return index
+
+        try:
+            # Packet flags mark keyframes, so the scan demuxes without decoding anything
+            cmd = [
+                "ffprobe",
+                "-v", "quiet",
+                "-select_streams", "v:0",
+                "-show_entries", "packet=pts_time,flags",
+                "-of", "csv=p=0",
                 file_path
             ]
 
@@ -27,113 +178,502 @@ class FFmpegHelper:
             )
 
             stdout, stderr = await process.communicate()
-            if process.returncode == 0:
-                return json.loads(stdout.decode())
-            return None
+            if process.returncode != 0:
+                return None
+
+            times = array("d")
+            for line in stdout.decode().splitlines():
+                pts_time, _, flags = line.partition(",")
+                if "K" in flags and pts_time not in ("", "N/A"):
+                    times.append(float(pts_time))
+
+            index = KeyframeIndex(array("d", sorted(times)))
+            keyframe_store.put(file_path, index, file_unique_id)
+            return index
         except Exception as e:
-            print(f"Error getting video info: {e}")
+            print(f"Error building keyframe index: {e}")
             return None
 
+    @staticmethod
+    def _video_encode_args(settings: Dict) -> list:
+        """Build ffmpeg video encoder arguments from encoding settings"""
+        args = ["-c:v", settings.get("codec", "libx264")]
+
+        if "crf" in settings:
+            args.extend(["-crf", str(settings["crf"])])
+
+        if "resolution" in settings:
+            args.extend(["-vf", f"scale={settings['resolution']}"])
+
+        if "preset" in settings:
+            args.extend(["-preset", settings["preset"]])
+
+        if "pixel_format" in settings:
+            args.extend(["-pix_fmt", settings["pixel_format"]])
+
+        return args
+
+    @staticmethod
+    def _audio_encode_args(settings: Dict) -> list:
+        """Build ffmpeg audio encoder arguments from encoding settings"""
+        args = ["-c:a", settings.get("audio_codec", "aac")]
+
+        if "audio_bitrate" in settings:
+            args.extend(["-b:a", settings["audio_bitrate"]])
+
+        return args
+
+    @staticmethod
+    def _parse_bitrate(value) -> int:
+        """Parse bitrate like '5000k' or '1.5M' into bits per second"""
+        try:
+            value = str(value).strip().lower()
+            multiplier = {"k": 1000, "m": 1000000}.get(value[-1:], 1)
+            return int(float(value.rstrip("km")) * multiplier)
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def plan_encode(descriptor: Optional[MediaDescriptor], settings: Dict) -> Dict:
+        """Decide per stream whether the source can be copied or needs transcoding"""
+        plan = {
+            "video": "transcode",
+            "video_reason": "no preset target",
+            "audio": "transcode" if descriptor and descriptor.audio else "none",
+            "audio_reason": ""
+        }
+        if not descriptor or not descriptor.video:
+            plan["video_reason"] = "source not probed"
+            return plan
+
+        video = descriptor.video
+        target_codec = FFmpegHelper.ENCODER_CODECS.get(settings.get("codec", "libx264"))
+        target_bitrate = FFmpegHelper._parse_bitrate(settings.get("bitrate", 0))
+        source_bitrate = video.bit_rate or max(0, descriptor.bit_rate - (descriptor.audio.bit_rate if descriptor.audio else 0))
+
+        # Only named presets define a bitrate target; custom settings always transcode
+        if target_bitrate:
+            width, height = (int(x) for x in settings.get("resolution", "0x0").split("x"))
+            if video.codec_name != target_codec:
+                plan["video_reason"] = f"codec {video.codec_name} → {target_codec}"
+            elif width and height and (video.width > width or video.height > height):
+                plan["video_reason"] = f"resolution {video.width}x{video.height} > {width}x{height}"
+            elif not source_bitrate:
+                plan["video_reason"] = "bitrate unknown"
+            elif source_bitrate > target_bitrate * 1.1:
+                plan["video_reason"] = f"bitrate {source_bitrate // 1000}k > {target_bitrate // 1000}k"
+            elif video.pix_fmt != settings.get("pixel_format", "yuv420p"):
+                plan["video_reason"] = f"pixel format {video.pix_fmt}"
+            else:
+                plan["video"] = "copy"
+                plan["video_reason"] = f"{video.codec_name} {video.width}x{video.height} already within preset"
+
+        audio = descriptor.audio
+        if audio:
+            target_codec = FFmpegHelper.ENCODER_CODECS.get(settings.get("audio_codec", "aac"))
+            target_bitrate = FFmpegHelper._parse_bitrate(settings.get("audio_bitrate", 0))
+            if audio.codec_name != target_codec:
+                plan["audio_reason"] = f"codec {audio.codec_name} → {target_codec}"
+            elif target_bitrate and audio.bit_rate > target_bitrate * 1.1:
+                plan["audio_reason"] = f"bitrate {audio.bit_rate // 1000}k > {target_bitrate // 1000}k"
+            else:
+                plan["audio"] = "copy"
+                plan["audio_reason"] = f"{audio.codec_name} already within preset"
+
+        return plan
+
     @staticmethod
     async def encode_video(input_file: str, output_file: str, settings: Dict, status_msg=None) -> bool:
         """Encode video with specified settings and progress tracking"""
         try:
-            duration = await FFmpegHelper._get_duration(input_file)
-            
+            descriptor = await FFmpegHelper.probe(input_file)
+            duration = descriptor.duration if descriptor else 0
+
+            plan = FFmpegHelper.plan_encode(descriptor, settings)
+            audio_args = ["-c:a", "copy"] if plan["audio"] == "copy" else FFmpegHelper._audio_encode_args(settings)
+
+            if plan["video"] == "copy":
+                if status_msg:
+                    try:
+                        await status_msg.edit_text(
+                            "♻️ **Source Already Matches Preset**\n\n"
+                            f"🎥 Video: copy ({plan['video_reason']})\n"
+                            f"🎵 Audio: {plan['audio']} ({plan['audio_reason']})"
+                        )
+                    except:
+                        pass
+
+                cmd = ["ffmpeg", "-i", input_file, "-map", "0:v:0", "-map", "0:a:0?", "-c:v", "copy"]
+                cmd.extend(audio_args)
+                cmd.extend(["-y", output_file])
+                return await FFmpegHelper._run_ffmpeg(cmd, duration, status_msg, "Remuxing")
+
+            if settings.get("parallel") and duration >= Config.PARALLEL_MIN_DURATION:
+                return await FFmpegHelper._encode_parallel(
+                    input_file, output_file, settings, duration, status_msg, audio_args
+                )
+
             cmd = ["ffmpeg", "-i", input_file, "-y"]
+            cmd.extend(FFmpegHelper._video_encode_args(settings))
+            cmd.extend(audio_args)
+            cmd.append(output_file)
 
-            cmd.extend(["-c:v", settings.get("codec", "libx264")])
+            return await FFmpegHelper._run_ffmpeg(cmd, duration, status_msg, "Encoding")
+        except Exception as e:
+            print(f"Error encoding video: {e}")
+            return False
 
-            if "crf" in settings:
-                cmd.extend(["-crf", str(settings["crf"])])
+    @staticmethod
+    async def encode_ladder(input_file: str, outputs: Dict[str, Dict], status_msg=None) -> bool:
+        """Encode several renditions from a single decode using a split filter graph"""
+        try:
+            duration = await FFmpegHelper._get_duration(input_file)
+            descriptor = await FFmpegHelper.probe(input_file)
+            has_audio = bool(descriptor and descriptor.audio)
 
-            if "resolution" in settings:
-                cmd.extend(["-vf", f"scale={settings['resolution']}"])
+            labels = "".join(f"[v{i}]" for i in range(len(outputs)))
+            graph = [f"[0:v:0]split={len(outputs)}{labels}"]
+            for i, settings in enumerate(outputs.values()):
+                if "resolution" in settings:
+                    graph.append(f"[v{i}]scale={settings['resolution']}[out{i}]")
+                else:
+                    graph.append(f"[v{i}]null[out{i}]")
 
-            if "preset" in settings:
-                cmd.extend(["-preset", settings["preset"]])
+            cmd = ["ffmpeg", "-i", input_file, "-filter_complex", ";".join(graph), "-y"]
 
-            cmd.extend(["-c:a", settings.get("audio_codec", "aac")])
+            for i, (output_file, settings) in enumerate(outputs.items()):
+                # Scaling already happens in the graph
+                output_settings = {k: v for k, v in settings.items() if k != "resolution"}
+                cmd.extend(["-map", f"[out{i}]"])
+                cmd.extend(FFmpegHelper._video_encode_args(output_settings))
+                if has_audio:
+                    cmd.extend(["-map", "0:a:0"])
+                    cmd.extend(FFmpegHelper._audio_encode_args(output_settings))
+                cmd.append(output_file)
 
-            if "audio_bitrate" in settings:
-                cmd.extend(["-b:a", settings["audio_bitrate"]])
+            return await FFmpegHelper._run_ffmpeg(
+                cmd, duration, status_msg, "Encoding Renditions", outputs=list(outputs)
+            )
+        except Exception as e:
+            print(f"Error encoding renditions: {e}")
+            return False
 
-            if "pixel_format" in settings:
-                cmd.extend(["-pix_fmt", settings["pixel_format"]])
+    @staticmethod
+    async def _encode_parallel(input_file: str, output_file: str, settings: Dict, duration: float, status_msg=None,
+                               audio_args: list = None) -> bool:
+        """Split video at keyframes, encode segments concurrently and concat them losslessly"""
+        work_dir = f"{output_file}_parts"
+        os.makedirs(work_dir, exist_ok=True)
 
-            cmd.extend(["-threads", str(Config.FFMPEG_THREADS)])
-            cmd.append(output_file)
+        try:
+            segments = max(1, Config.PARALLEL_SEGMENTS or ffmpeg_scheduler.max_jobs)
+            split_cmd = [
+                "ffmpeg",
+                "-i", input_file,
+                "-map", "0:v:0",
+                "-c", "copy",
+                "-f", "segment",
+                "-reset_timestamps", "1"
+            ]
 
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+            # Cut exactly at the keyframes closest to equal-length boundaries when the index is available
+            index = await FFmpegHelper.get_keyframe_index(input_file)
+            boundaries = sorted({
+                index.after(duration * i / segments) for i in range(1, segments)
+            } - {None}) if index else []
+            if boundaries:
+                split_cmd.extend(["-segment_times", ",".join(f"{t:.6f}" for t in boundaries)])
+            else:
+                split_cmd.extend(["-segment_time", f"{duration / segments:.3f}"])
+            split_cmd.extend(["-y", os.path.join(work_dir, "src_%04d.mkv")])
+            if not await FFmpegHelper._run_ffmpeg(split_cmd, duration, status_msg, "Splitting"):
+                return False
+
+            sources = sorted(f for f in os.listdir(work_dir) if f.startswith("src_"))
+
+            # Sum per-segment progress into one view on the status message
+            renderer = FFmpegHelper._status_renderer(status_msg, "Encoding (Parallel)") if status_msg else None
+            segment_events = {}
+
+            async def aggregate(event: ProgressEvent):
+                segment_events[event.job_id] = event
+                if renderer:
+                    await renderer(ProgressEvent(
+                        job_id=event.job_id,
+                        operation="Encoding",
+                        task_id=event.task_id,
+                        duration=duration,
+                        out_time=sum(e.out_time for e in segment_events.values()),
+                        fps=sum(e.fps for e in segment_events.values()),
+                        speed=sum(e.speed for e in segment_events.values())
+                    ))
+
+            jobs = []
+            encoded = []
+            job_ids = []
+            for source in sources:
+                target = os.path.join(work_dir, source.replace("src_", "enc_"))
+                cmd = ["ffmpeg", "-i", os.path.join(work_dir, source), "-y"]
+                cmd.extend(FFmpegHelper._video_encode_args(settings))
+                cmd.extend(["-an", target])
+
+                job_id = uuid.uuid4().hex
+                job_ids.append(job_id)
+                progress_bus.subscribe(aggregate, job_id)
+                jobs.append(FFmpegHelper._run_ffmpeg(cmd, operation="Encoding Segment", job_id=job_id))
+                encoded.append(target)
+
+            audio_file = None
+            descriptor = await FFmpegHelper.probe(input_file)
+            if descriptor and descriptor.audio:
+                audio_file = os.path.join(work_dir, "audio.mka")
+                cmd = ["ffmpeg", "-i", input_file, "-map", "0:a:0", "-vn", "-y"]
+                cmd.extend(audio_args or FFmpegHelper._audio_encode_args(settings))
+                cmd.append(audio_file)
+                jobs.append(FFmpegHelper._run_ffmpeg(cmd, operation="Encoding Audio"))
+
+            try:
+                results = await asyncio.gather(*jobs)
+            finally:
+                for job_id in job_ids:
+                    progress_bus.unsubscribe(aggregate, job_id)
+
+            if not sources or not all(results):
+                return False
+
+            concat_file = os.path.join(work_dir, "concat.txt")
+            with open(concat_file, "w") as f:
+                for segment in encoded:
+                    f.write(f"file '{os.path.abspath(segment)}'\n")
+
+            cmd = ["ffmpeg", "-f", "concat", "-safe", "0", "-i", concat_file]
+            if audio_file:
+                cmd.extend(["-i", audio_file, "-map", "0:v:0", "-map", "1:a:0"])
+            cmd.extend(["-c", "copy", "-y", output_file])
+
+            return await FFmpegHelper._run_ffmpeg(cmd, duration, status_msg, "Joining Segments")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    @staticmethod
+    async def _run_ffmpeg(cmd: list, duration: float = 0, status_msg=None, operation: str = "Processing",
+                          job_id: str = None, input_stream=None, outputs: list = None) -> bool:
+        """Run an ffmpeg command once the scheduler grants it a slot; outputs defaults to the last argument"""
+        queued_at = time.time()
+        async with ffmpeg_scheduler.job(status_msg, operation) as threads:
+            ffmpeg_queue_wait.observe(time.time() - queued_at, operation=operation)
+            record_span("queue", queued_at, operation=operation)
+
+            # -threads is an output option and has to be repeated before every output file
+            outputs = set(outputs or [cmd[-1]])
+            args = []
+            for arg in cmd[1:]:
+                if arg in outputs:
+                    args.extend(["-threads", str(threads)])
+                args.append(arg)
+            cmd = [cmd[0], "-hide_banner", "-loglevel", "error", "-progress", "pipe:1", "-nostats"] + args
+
+            event = ProgressEvent(
+                job_id=job_id or uuid.uuid4().hex,
+                operation=operation,
+                task_id=current_task_id.get(),
+                duration=duration
             )
+            renderer = FFmpegHelper._status_renderer(status_msg, operation) if status_msg else None
+            if renderer:
+                progress_bus.subscribe(renderer, event.job_id)
+
+            feeder = None
+            started_at = time.time()
+            ffmpeg_processes.inc()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdin=asyncio.subprocess.PIPE if input_stream else asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                if input_stream:
+                    feeder = asyncio.create_task(FFmpegHelper._feed_stdin(process, input_stream))
 
-            asyncio.create_task(
-                FFmpegHelper._track_progress(process, duration, status_msg, "Encoding")
+                _, stderr = await asyncio.gather(
+                    progress_bus.read_ffmpeg_progress(process.stdout, event),
+                    process.stderr.read()
+                )
+                await process.wait()
+            finally:
+                ffmpeg_processes.dec()
+                if feeder:
+                    feeder.cancel()
+                if renderer:
+                    progress_bus.unsubscribe(renderer, event.job_id)
+                # ffmpeg only reports progress=end on success; close the job for subscribers either way
+                if not event.finished:
+                    event.finished = True
+                    progress_bus.publish(event)
+
+            record_span(
+                "ffmpeg", started_at, operation=operation, ok=process.returncode == 0,
+                speed=event.speed or None, fps=event.fps or None
             )
+            if process.returncode != 0:
+                ffmpeg_failures.inc(operation=operation)
+                print(f"FFmpeg {operation} failed: {stderr.decode('utf-8', errors='ignore')[-500:]}")
+                return False
 
-            await process.communicate()
-            return process.returncode == 0
-        except Exception as e:
-            print(f"Error encoding video: {e}")
-            return False
+            ffmpeg_duration.observe(time.time() - started_at, operation=operation)
+            if event.fps > 0:
+                ffmpeg_fps.observe(event.fps, operation=operation)
+            if event.speed > 0:
+                ffmpeg_speed.observe(event.speed, operation=operation)
+            return True
 
     @staticmethod
     async def _get_duration(file_path: str) -> float:
         """Get video duration in seconds"""
+        descriptor = await FFmpegHelper.probe(file_path)
+        return descriptor.duration if descriptor else 0
+
+    @staticmethod
+    def _parse_time(value) -> float:
+        """Parse seconds or HH:MM:SS(.ms) into seconds"""
         try:
-            info = await FFmpegHelper.get_video_info(file_path)
-            if info and "format" in info:
-                return float(info["format"].get("duration", 0))
-            return 0
-        except:
+            seconds = 0.0
+            for part in str(value).split(":"):
+                seconds = seconds * 60 + float(part)
+            return seconds
+        except ValueError:
             return 0
 
     @staticmethod
-    async def _track_progress(process, duration, status_msg, operation="Processing"):
-        """Track FFmpeg progress"""
-        try:
-            if not status_msg or duration <= 0:
+    def _status_renderer(status_msg, operation: str = "Processing"):
+        """Build a progress bus subscriber that renders events on a status message"""
+        last_update = [0]
+
+        async def render(event: ProgressEvent):
+            if event.finished or time.time() - last_update[0] <= 3:
                 return
+            last_update[0] = time.time()
+
+            text = f"⚙️ **{operation}...**\n\n"
+            if event.percentage is not None:
+                text += (
+                    f"📊 Progress: {event.percentage:.1f}%\n"
+                    f"⏱️ Time: {int(event.out_time)}s / {int(event.duration)}s\n"
+                )
+            else:
+                text += f"⏱️ Time: {int(event.out_time)}s\n"
+            text += f"⚡ Speed: {event.speed:.2f}x"
 
-            last_update = 0
-            while True:
-                line = await process.stderr.readline()
-                if not line:
-                    break
-
-                line = line.decode('utf-8', errors='ignore')
-                
-                time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line)
-                if time_match:
-                    hours, mins, secs = map(float, time_match.groups())
-                    current_time = hours * 3600 + mins * 60 + secs
-                    percentage = min((current_time / duration) * 100, 100)
-                    
-                    import time as time_module
-                    if time_module.time() - last_update > 3:
-                        last_update = time_module.time()
+            try:
+                await status_msg.edit_text(text)
+            except:
+                pass
+
+        return render
+
+    @staticmethod
+    def _concat_signature(descriptor: MediaDescriptor) -> tuple:
+        """Stream parameters that must match for a stream-copy concat"""
+        video, audio = descriptor.video, descriptor.audio
+        video_sig = (video.codec_name, video.width, video.height, video.pix_fmt, video.frame_rate)
+        audio_sig = (audio.codec_name, audio.sample_rate, audio.channels) if audio else None
+        return video_sig, audio_sig
+
+    @staticmethod
+    def _normalize_command(source: MediaDescriptor, target: tuple, output: str) -> list:
+        """Build a command converting only the mismatched streams of an input to the target format"""
+        (codec, width, height, pix_fmt, frame_rate), target_audio = target
+        source_video, source_audio = FFmpegHelper._concat_signature(source)
+        add_silence = target_audio and not source_audio
+
+        cmd = ["ffmpeg", "-i", source.path]
+        if add_silence:
+            cmd.extend(["-f", "lavfi", "-i", f"anullsrc=r={target_audio[1]}:cl={'mono' if target_audio[2] == 1 else 'stereo'}"])
+
+        cmd.extend(["-map", "0:v:0"])
+        if source_video == (codec, width, height, pix_fmt, frame_rate):
+            cmd.extend(["-c:v", "copy"])
+        else:
+            cmd.extend([
+                "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                       f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={frame_rate}",
+                "-c:v", FFmpegHelper.SMART_CUT_ENCODERS[codec],
+                "-crf", "18",
+                "-preset", "veryfast",
+                "-pix_fmt", pix_fmt
+            ])
+
+        if not target_audio:
+            cmd.append("-an")
+        elif source_audio == target_audio:
+            cmd.extend(["-map", "0:a:0", "-c:a", "copy"])
+        else:
+            audio_codec, sample_rate, channels = target_audio
+            cmd.extend([
+                "-map", "1:a:0" if add_silence else "0:a:0",
+                "-c:a", FFmpegHelper.AUDIO_ENCODERS[audio_codec],
+                "-ar", str(sample_rate),
+                "-ac", str(channels)
+            ])
+            if add_silence:
+                cmd.append("-shortest")
+
+        cmd.extend(["-y", output])
+        return cmd
+
+    @staticmethod
+    async def merge_videos(video_files: list, output: str, status_msg=None) -> bool:
+        """Merge multiple videos, normalizing only the inputs that can't be stream-copied"""
+        work_dir = f"{output}_parts"
+        try:
+            descriptors = [await FFmpegHelper.probe(video) for video in video_files]
+            duration = sum(d.duration for d in descriptors if d)
+            inputs = list(video_files)
+
+            if all(d and d.video for d in descriptors):
+                signatures = [FFmpegHelper._concat_signature(d) for d in descriptors]
+                (codec, *video_params), target_audio = Counter(signatures).most_common(1)[0][0]
+
+                # Fall back to H.264/AAC when the majority format has no encoder we can match
+                if codec not in FFmpegHelper.SMART_CUT_ENCODERS:
+                    codec = "h264"
+                if target_audio and target_audio[0] not in FFmpegHelper.AUDIO_ENCODERS:
+                    target_audio = ("aac", *target_audio[1:])
+                target = ((codec, *video_params), target_audio)
+
+                timebases = {d.video.time_base for d in descriptors}
+                if any(sig != target for sig in signatures) or len(timebases) > 1:
+                    os.makedirs(work_dir, exist_ok=True)
+                    # MPEG-TS carries parameter sets in-band, so re-encoded and copied parts concat cleanly
+                    extension = "ts" if codec in ("h264", "hevc") else "mkv"
+
+                    jobs = []
+                    inputs = []
+                    for i, (descriptor, signature) in enumerate(zip(descriptors, signatures)):
+                        part = os.path.join(work_dir, f"part_{i}.{extension}")
+                        operation = "Remuxing" if signature == target else "Normalizing"
+                        cmd = FFmpegHelper._normalize_command(descriptor, target, part)
+                        jobs.append(FFmpegHelper._run_ffmpeg(cmd, descriptor.duration, operation=operation))
+                        inputs.append(part)
+
+                    if status_msg:
+                        mismatched = sum(1 for sig in signatures if sig != target)
                         try:
                             await status_msg.edit_text(
-                                f"⚙️ **{operation}...**\n\n"
-                                f"📊 Progress: {percentage:.1f}%\n"
-                                f"⏱️ Time: {int(current_time)}s / {int(duration)}s"
+                                "⏳ **Processing...**\n\n"
+                                f"🔧 Normalizing {mismatched}/{len(signatures)} inputs for merge..."
                             )
                         except:
                             pass
-        except Exception as e:
-            print(f"Progress tracking error: {e}")
 
-    @staticmethod
-    async def merge_videos(video_files: list, output: str, status_msg=None) -> bool:
-        """Merge multiple videos"""
-        try:
+                    if not all(await asyncio.gather(*jobs)):
+                        return False
+
             concat_file = f"{output}.txt"
             with open(concat_file, "w") as f:
-                for video in video_files:
-                    f.write(f"file '{video}'\n")
+                for video in inputs:
+                    f.write(f"file '{os.path.abspath(video)}'\n")
 
             cmd = [
                 "ffmpeg",
@@ -144,18 +684,15 @@ class FFmpegHelper:
                 "-y", output
             ]
 
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-
-            await process.communicate()
-            os.remove(concat_file)
-            return process.returncode == 0
+            try:
+                return await FFmpegHelper._run_ffmpeg(cmd, duration, status_msg, "Merging")
+            finally:
+                os.remove(concat_file)
         except Exception as e:
             print(f"Error merging videos: {e}")
             return False
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
 
     @staticmethod
     async def merge_video_audio(video: str, audio: str, output: str, status_msg=None) -> bool:
@@ -175,18 +712,7 @@ class FFmpegHelper:
                 "-y", output
             ]
 
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-
-            asyncio.create_task(
-                FFmpegHelper._track_progress(process, duration, status_msg, "Merging")
-            )
-
-            await process.communicate()
-            return process.returncode == 0
+            return await FFmpegHelper._run_ffmpeg(cmd, duration, status_msg, "Merging")
         except Exception as e:
             print(f"Error merging video and audio: {e}")
             return False
@@ -206,18 +732,7 @@ class FFmpegHelper:
                 "-y", output
             ]
 
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-
-            asyncio.create_task(
-                FFmpegHelper._track_progress(process, duration, status_msg, "Merging")
-            )
-
-            await process.communicate()
-            return process.returncode == 0
+            return await FFmpegHelper._run_ffmpeg(cmd, duration, status_msg, "Merging")
         except Exception as e:
             print(f"Error merging video and subtitle: {e}")
             return False
@@ -247,43 +762,154 @@ class FFmpegHelper:
                 "-y", output
             ]
 
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-
-            asyncio.create_task(
-                FFmpegHelper._track_progress(process, duration, status_msg, "Adding Watermark")
-            )
-
-            await process.communicate()
-            return process.returncode == 0
+            return await FFmpegHelper._run_ffmpeg(cmd, duration, status_msg, "Adding Watermark")
         except Exception as e:
             print(f"Error adding watermark: {e}")
             return False
 
+    @staticmethod
+    async def _find_keyframes(video: str, start: float, end: float) -> list:
+        """List video keyframe timestamps around [start, end] using a seeking packet scan"""
+        index = keyframe_store.get(video)
+        if index is not None:
+            return index.between(start, end)
+
+        cmd = [
+            "ffprobe",
+            "-v", "quiet",
+            "-print_format", "json",
+            "-select_streams", "v:0",
+            "-show_entries", "packet=pts_time,flags",
+            "-read_intervals", f"{start:.3f}%{end:.3f}",
+            video
+        ]
+
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            return []
+
+        packets = json.loads(stdout.decode()).get("packets", [])
+        return sorted(float(p["pts_time"]) for p in packets if "K" in p.get("flags", "") and "pts_time" in p)
+
+    @staticmethod
+    def _smart_cut_args(stream) -> Optional[list]:
+        """Encoder options reproducing the source's profile, level and reference frames; None if they can't be matched"""
+        profile = FFmpegHelper.SMART_CUT_PROFILES.get(stream.codec_name, {}).get(stream.profile)
+        if not profile:
+            return None
+
+        if stream.codec_name == "h264":
+            # ffprobe reports level_idc, e.g. 41 for level 4.1
+            if stream.level < 10:
+                return None
+            args = ["-profile:v", profile, "-level:v", f"{stream.level / 10:g}"]
+            if stream.refs:
+                args.extend(["-refs", str(stream.refs)])
+            return args
+
+        # HEVC general_level_idc is 30 times the level, e.g. 123 for level 4.1
+        if stream.level < 30:
+            return None
+        return ["-profile:v", profile, "-x265-params", f"level-idc={stream.level / 30:g}"]
+
+    @staticmethod
+    def _cut_command(video: str, output: str, start: float, end: float, encoder: str = None, pix_fmt: str = None,
+                     encoder_args: list = None, frames: int = 0, keyframe_start: bool = False) -> list:
+        """Build an input-seeking cut of [start, end), re-encoding video when an encoder is given
+
+        frames caps the video frame count, since -t on stream-copied B-frame video is measured on dts and
+        lets the frame at end through. keyframe_start drops anything the demuxer seek returned before start.
+        """
+        cmd = [
+            "ffmpeg",
+            "-ss", f"{start:.6f}",
+            "-i", video,
+            "-t", f"{end - start:.6f}",
+            "-map", "0:v:0",
+            "-map", "0:a:0?",
+            "-c", "copy"
+        ]
+        if frames:
+            cmd.extend(["-frames:v", str(frames)])
+        if keyframe_start:
+            cmd.extend(["-copy_prior_start", "0"])
+        if encoder:
+            cmd.extend(["-c:v", encoder, "-crf", "18", "-preset", "veryfast"])
+            if pix_fmt:
+                cmd.extend(["-pix_fmt", pix_fmt])
+            cmd.extend(encoder_args or [])
+        cmd.extend(["-avoid_negative_ts", "make_zero", "-y", output])
+        return cmd
+
     @staticmethod
     async def trim_video(video: str, output: str, start_time: str, duration: str, status_msg=None) -> bool:
-        """Trim video"""
+        """Trim video with fast input seeking and frame-accurate smart cut"""
         try:
-            cmd = [
-                "ffmpeg",
-                "-i", video,
-                "-ss", start_time,
-                "-t", duration,
-                "-c", "copy",
-                "-y", output
-            ]
+            start = FFmpegHelper._parse_time(start_time)
+            length = FFmpegHelper._parse_time(duration)
+            end = start + length
 
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+            descriptor = await FFmpegHelper.probe(video)
+            video_stream = descriptor.video if descriptor else None
+            encoder = FFmpegHelper.SMART_CUT_ENCODERS.get(video_stream.codec_name) if video_stream else None
+
+            # Codecs we can't re-encode to a matching stream fall back to a keyframe-aligned copy
+            if not encoder:
+                cmd = FFmpegHelper._cut_command(video, output, start, end)
+                return await FFmpegHelper._run_ffmpeg(cmd, length, status_msg, "Trimming")
+
+            # Re-encoded edges are concat-copied with the source GOPs, so their parameters must match the source;
+            # when they can't be matched the whole range is re-encoded into one consistent stream
+            encoder_args = FFmpegHelper._smart_cut_args(video_stream)
+            keyframes = []
+            if encoder_args is not None:
+                keyframes = [t for t in await FFmpegHelper._find_keyframes(video, start, end) if start <= t <= end]
+            if len(keyframes) < 2:
+                cmd = FFmpegHelper._cut_command(video, output, start, end, encoder, video_stream.pix_fmt)
+                return await FFmpegHelper._run_ffmpeg(cmd, length, status_msg, "Trimming")
+
+            first_key, last_key = keyframes[0], keyframes[-1]
+            work_dir = f"{output}_parts"
+            os.makedirs(work_dir, exist_ok=True)
 
-            await process.communicate()
-            return process.returncode == 0
+            try:
+                # Re-encode only the partial GOPs at each edge, stream-copy everything in between
+                parts = []
+                if first_key - start > 0.001:
+                    parts.append((start, first_key, encoder))
+                parts.append((first_key, last_key, None))
+                if end - last_key > 0.001:
+                    parts.append((last_key, end, encoder))
+
+                part_files = []
+                for i, (part_start, part_end, part_encoder) in enumerate(parts):
+                    part_file = os.path.join(work_dir, f"part_{i}.ts")
+                    # Each part must stop before the first frame of the next one or the join repeats it
+                    frames = round((part_end - part_start) * video_stream.fps) if video_stream.fps else 0
+                    cmd = FFmpegHelper._cut_command(
+                        video, part_file, part_start, part_end, part_encoder, video_stream.pix_fmt, encoder_args,
+                        frames=frames, keyframe_start=not part_encoder
+                    )
+                    part_msg = status_msg if not part_encoder else None
+                    if not await FFmpegHelper._run_ffmpeg(cmd, part_end - part_start, part_msg, "Trimming"):
+                        return False
+                    part_files.append(part_file)
+
+                concat_file = os.path.join(work_dir, "concat.txt")
+                with open(concat_file, "w") as f:
+                    for part_file in part_files:
+                        f.write(f"file '{os.path.abspath(part_file)}'\n")
+
+                cmd = ["ffmpeg", "-f", "concat", "-safe", "0", "-i", concat_file, "-c", "copy", "-y", output]
+                return await FFmpegHelper._run_ffmpeg(cmd, length, status_msg, "Joining Parts")
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
         except Exception as e:
             print(f"Error trimming video: {e}")
             return False
@@ -292,49 +918,68 @@ class FFmpegHelper:
     async def generate_sample(video: str, output: str, duration: int = 30, status_msg=None) -> bool:
         """Generate sample video"""
         try:
-            info = await FFmpegHelper.get_video_info(video)
-            if not info:
+            descriptor = await FFmpegHelper.probe(video)
+            if not descriptor:
                 return False
 
-            total_duration = float(info["format"]["duration"])
+            total_duration = descriptor.duration
+            start_time = max(0, (total_duration - duration) / 2)
+
+            cmd = FFmpegHelper._cut_command(video, output, start_time, start_time + duration)
+            return await FFmpegHelper._run_ffmpeg(cmd, min(duration, total_duration), status_msg, "Generating Sample")
+        except Exception as e:
+            print(f"Error generating sample: {e}")
+            return False
+
+    @staticmethod
+    async def generate_sample_from_stream(chunks, total_duration: float, output: str, duration: int = 30,
+                                          status_msg=None) -> bool:
+        """Generate sample video while the source is still arriving on stdin"""
+        try:
             start_time = max(0, (total_duration - duration) / 2)
 
+            # Output-side -ss: a pipe can't seek, so packets before the start are read and dropped
             cmd = [
                 "ffmpeg",
-                "-i", video,
-                "-ss", str(start_time),
+                "-i", "pipe:0",
+                "-ss", f"{start_time:.3f}",
                 "-t", str(duration),
+                "-map", "0:v:0",
+                "-map", "0:a:0?",
                 "-c", "copy",
                 "-y", output
             ]
 
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+            return await FFmpegHelper._run_ffmpeg(
+                cmd, min(duration, total_duration), status_msg, "Generating Sample", input_stream=chunks
             )
-
-            await process.communicate()
-            return process.returncode == 0
         except Exception as e:
-            print(f"Error generating sample: {e}")
+            print(f"Error generating sample from stream: {e}")
             return False
 
     @staticmethod
-    async def get_mediainfo_text(video: str) -> str:
+    async def get_mediainfo_text(video: str, file_unique_id: str = None) -> str:
         """Get detailed media info as text"""
         try:
-            info = await FFmpegHelper.get_video_info(video)
+            info = await FFmpegHelper.get_video_info(video, file_unique_id)
             if not info:
                 return "❌ Unable to get media info"
 
+            return FFmpegHelper.format_mediainfo(info, os.path.basename(video))
+        except Exception as e:
+            return f"❌ Error getting media info: {str(e)}"
+
+    @staticmethod
+    def format_mediainfo(info: Dict, file_name: str, file_size: int = None) -> str:
+        """Render ffprobe output as media info text"""
+        try:
             format_info = info.get("format", {})
             video_stream = next((s for s in info.get("streams", []) if s.get("codec_type") == "video"), {})
             audio_stream = next((s for s in info.get("streams", []) if s.get("codec_type") == "audio"), {})
 
             text = "📊 **Media Information**\n\n"
-            text += f"📁 **File**: {os.path.basename(video)}\n"
-            text += f"📦 **Size**: {int(format_info.get('size', 0)) / (1024*1024):.2f} MB\n"
+            text += f"📁 **File**: {file_name}\n"
+            text += f"📦 **Size**: {int(file_size or format_info.get('size', 0)) / (1024*1024):.2f} MB\n"
             text += f"⏱ **Duration**: {float(format_info.get('duration', 0)):.2f} seconds\n"
             text += f"🎞 **Format**: {format_info.get('format_name', 'N/A')}\n\n"
 
@@ -368,21 +1013,78 @@ class FFmpegHelper:
         try:
             cmd = [
                 "ffmpeg",
-                "-i", video,
                 "-ss", time,
+                "-i", video,
                 "-vframes", "1",
                 "-y", output
             ]
 
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-
-            await process.communicate()
-            return process.returncode == 0
+            return await FFmpegHelper._run_ffmpeg(cmd, operation="Generating Thumbnail")
         except Exception as e:
             print(f"Error generating thumbnail: {e}")
             return False
+
+    @staticmethod
+    async def generate_screenshots(video: str, output_dir: str, count: int = 9, mode: str = "interval",
+                                   tile: bool = False, status_msg=None) -> list:
+        """Extract evenly spaced or scene-change keyframes in one pass, optionally as a contact sheet"""
+        try:
+            descriptor = await FFmpegHelper.probe(video)
+            if not descriptor or not descriptor.video:
+                return []
+
+            os.makedirs(output_dir, exist_ok=True)
+            columns = math.ceil(math.sqrt(count))
+            rows = math.ceil(count / columns)
+            layout = f"tile={columns}x{rows}:padding=4:margin=4"
+            scale = "scale=480:-2"
+            outputs = None
+
+            if mode == "scene":
+                # Decode keyframes only and keep those that differ enough from the previous one
+                filters = f"select='gt(scene,0.3)',{scale}"
+                cmd = ["ffmpeg", "-skip_frame", "nokey", "-i", video, "-an", "-vsync", "vfr"]
+                if tile:
+                    cmd.extend(["-vf", f"{filters},{layout}", "-frames:v", "1", "-y", os.path.join(output_dir, "sheet.jpg")])
+                else:
+                    cmd.extend(["-vf", filters, "-frames:v", str(count), "-y", os.path.join(output_dir, "shot_%02d.jpg")])
+                duration = descriptor.duration
+            else:
+                # One input-seeked keyframe per timestamp, all in a single process; -skip_frame nokey
+                # already lands on a keyframe, so only use an index that exists instead of scanning for one
+                index = keyframe_store.get(video)
+                cmd = ["ffmpeg"]
+                for i in range(count):
+                    timestamp = descriptor.duration * (i + 0.5) / count
+                    keyframe = index.before(timestamp) if index else None
+                    if keyframe is not None:
+                        timestamp = keyframe
+                    cmd.extend(["-skip_frame", "nokey", "-ss", f"{timestamp:.3f}", "-i", video])
+
+                if tile:
+                    graph = [f"[{i}:v:0]trim=end_frame=1,{scale},setsar=1[s{i}]" for i in range(count)]
+                    inputs = "".join(f"[s{i}]" for i in range(count))
+                    graph.append(f"{inputs}concat=n={count}:v=1:a=0,{layout}[sheet]")
+                    cmd.extend([
+                        "-filter_complex", ";".join(graph),
+                        "-map", "[sheet]", "-frames:v", "1",
+                        "-y", os.path.join(output_dir, "sheet.jpg")
+                    ])
+                else:
+                    outputs = [os.path.join(output_dir, f"shot_{i + 1:02d}.jpg") for i in range(count)]
+                    for i, shot in enumerate(outputs):
+                        cmd.extend(["-map", f"{i}:v:0", "-frames:v", "1", "-y", shot])
+                duration = 0
+
+            shots = []
+            if await FFmpegHelper._run_ffmpeg(cmd, duration, status_msg, "Extracting Screenshots", outputs=outputs):
+                shots = sorted(os.path.join(output_dir, f) for f in os.listdir(output_dir) if f.endswith(".jpg"))
+
+            # Static or slideshow content has no scene changes; evenly spaced shots still describe it
+            if not shots and mode == "scene":
+                return await FFmpegHelper.generate_screenshots(video, output_dir, count, "interval", tile, status_msg)
+            return shots
+        except Exception as e:
+            print(f"Error generating screenshots: {e}")
+            return []
             
@@ -0,0 +1,48 @@
+import aiohttp
+from typing import Optional
+from config import Config
+
+class HTTPClient:
+    """Process-wide pooled aiohttp session for all outbound HTTP"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def chunk_size(self) -> int:
+        return Config.HTTP_CHUNK_SIZE
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=Config.HTTP_POOL_SIZE,
+            limit_per_host=Config.HTTP_POOL_PER_HOST,
+            ttl_dns_cache=Config.HTTP_DNS_TTL,
+            keepalive_timeout=Config.HTTP_KEEPALIVE
+        )
+        # No total timeout: multi-GB transfers legitimately run for a long time
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=300)
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            read_bufsize=Config.HTTP_CHUNK_SIZE
+        )
+
+    async def start(self):
+        """Open the shared session"""
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Shared session, created on first use if start() was not called"""
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    async def close(self):
+        """Close the session and its pooled connections"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+http_client = HTTPClient()
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import shutil
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from config import Config
+from bot.helpers.download_helper import DownloadHelper
+from bot.helpers.metrics import metrics
+from bot.helpers.volumes import Volume, volume_pool
+from bot.utils.helpers import get_media
+
+class InputCache:
+    """Content-addressed cache of downloaded Telegram inputs keyed by file_unique_id
+
+    Files live at <volume>/.inputs/<file_unique_id>/<file_name> on any scratch
+    volume. Entries are reference counted while a task uses them and least
+    recently used ones are evicted once the cache grows past its disk budget.
+    """
+
+    SUBDIR = ".inputs"
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        # file_unique_id -> [path, size, refs]
+        self._entries = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._loaded = False
+
+    def _load(self):
+        """Index files left on disk by a previous run, oldest first"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        found = []
+        for volume in volume_pool.volumes:
+            directory = volume.path(self.SUBDIR)
+            os.makedirs(directory, exist_ok=True)
+            for uid in os.listdir(directory):
+                entry_dir = os.path.join(directory, uid)
+                if not os.path.isdir(entry_dir):
+                    continue
+                files = [name for name in os.listdir(entry_dir) if not name.endswith(".tmp")]
+                if len(files) != 1:
+                    # Interrupted download
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    continue
+                path = os.path.join(entry_dir, files[0])
+                stat = os.stat(path)
+                found.append((stat.st_mtime, uid, path, stat.st_size))
+
+        for _, uid, path, size in sorted(found):
+            self._entries[uid] = [path, size, 0]
+
+    def _lock(self, uid: str) -> asyncio.Lock:
+        if uid not in self._locks:
+            self._locks[uid] = asyncio.Lock()
+        return self._locks[uid]
+
+    def _paths(self, uid: str, file_name: str, volume: Volume = None):
+        # Without a placement from the workspace manager, use the volume with the most free space
+        volume = volume or max(volume_pool.volumes, key=lambda v: v.free())
+        entry_dir = volume.path(self.SUBDIR, uid)
+        return os.path.join(entry_dir, file_name), os.path.join(entry_dir, f"{file_name}.tmp")
+
+    def _lookup(self, uid: str) -> Optional[str]:
+        entry = self._entries.get(uid)
+        if entry and not os.path.exists(entry[0]):
+            del self._entries[uid]
+            return None
+        return entry[0] if entry else None
+
+    def _hold(self, uid: str) -> str:
+        entry = self._entries[uid]
+        entry[2] += 1
+        self._entries.move_to_end(uid)
+        try:
+            os.utime(entry[0])
+        except OSError:
+            pass
+        return entry[0]
+
+    def _add(self, uid: str, path: str):
+        self._entries[uid] = [path, os.path.getsize(path), 0]
+
+    def _remove(self, uid: str) -> int:
+        """Delete an entry from disk and return the bytes reclaimed"""
+        path, size, _ = self._entries.pop(uid)
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        lock = self._locks.get(uid)
+        if lock and not lock.locked():
+            del self._locks[uid]
+        return size
+
+    def _evict(self):
+        """Drop unreferenced entries, least recently used first, until within budget"""
+        total = sum(entry[1] for entry in self._entries.values())
+        for uid in list(self._entries):
+            if total <= self.max_size:
+                break
+            if self._entries[uid][2] > 0:
+                continue
+            total -= self._remove(uid)
+
+    def free(self, nbytes: int) -> int:
+        """Evict unreferenced entries, least recently used first, until nbytes are reclaimed"""
+        self._load()
+        freed = 0
+        for uid in list(self._entries):
+            if freed >= nbytes:
+                break
+            if self._entries[uid][2] > 0:
+                continue
+            freed += self._remove(uid)
+        return freed
+
+    def contains(self, file_unique_id: str) -> bool:
+        self._load()
+        return self._lookup(file_unique_id) is not None
+
+    def pending_size(self, *messages) -> int:
+        """Bytes that still have to be downloaded to acquire these messages"""
+        self._load()
+        pending = {}
+        for message in messages:
+            media = get_media(message)
+            if not self._lookup(media.file_unique_id):
+                pending[media.file_unique_id] = getattr(media, "file_size", 0) or 0
+        return sum(pending.values())
+
+    async def acquire(self, client, message, file_name: str, status_msg=None,
+                      volume: Volume = None) -> Optional[str]:
+        """Return a local path for the message's media, downloading it to volume only on a cache miss"""
+        self._load()
+        uid = get_media(message).file_unique_id
+
+        async with self._lock(uid):
+            if not self._lookup(uid):
+                path, tmp_path = self._paths(uid, file_name, volume)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if not await DownloadHelper.download_telegram_file(client, message, tmp_path, status_msg):
+                    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+                    return None
+                os.replace(tmp_path, path)
+                self._add(uid, path)
+            path = self._hold(uid)
+
+        self._evict()
+        return path
+
+    async def acquire_many(self, client, items: List, status_msg=None,
+                           volume: Volume = None) -> List[Optional[str]]:
+        """Acquire several (message, file_name) pairs, downloading the misses concurrently"""
+        self._load()
+        uids = [get_media(message).file_unique_id for message, _ in items]
+
+        # Sorted lock order so overlapping batches cannot deadlock
+        locks = [self._lock(uid) for uid in sorted(set(uids))]
+        for lock in locks:
+            await lock.acquire()
+        try:
+            pending = OrderedDict()
+            for (message, file_name), uid in zip(items, uids):
+                if uid not in pending and not self._lookup(uid):
+                    pending[uid] = (message, *self._paths(uid, file_name, volume))
+
+            if pending:
+                for _, path, _ in pending.values():
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                results = await DownloadHelper.download_telegram_files(
+                    client, [(message, tmp_path) for message, _, tmp_path in pending.values()], status_msg
+                )
+                for (uid, (_, path, tmp_path)), result in zip(pending.items(), results):
+                    if result:
+                        os.replace(tmp_path, path)
+                        self._add(uid, path)
+                    else:
+                        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+            paths = [self._hold(uid) if self._lookup(uid) else None for uid in uids]
+        finally:
+            for lock in locks:
+                lock.release()
+
+        self._evict()
+        return paths
+
+    def release(self, *paths: str):
+        """Drop one reference per path; paths outside the cache are ignored"""
+        for path in paths:
+            if not path:
+                continue
+            uid = os.path.basename(os.path.dirname(path))
+            entry = self._entries.get(uid)
+            if entry and entry[0] == path:
+                entry[2] = max(0, entry[2] - 1)
+        self._evict()
+
+    def get_status(self) -> Dict:
+        """Get current cache usage"""
+        self._load()
+        return {
+            "files": len(self._entries),
+            "size": sum(entry[1] for entry in self._entries.values()),
+            "max_size": self.max_size,
+            "in_use": sum(1 for entry in self._entries.values() if entry[2] > 0)
+        }
+
+input_cache = InputCache(Config.INPUT_CACHE_SIZE)
+
+metrics.gauge("input_cache_bytes", "Bytes held by the input cache", callback=lambda: {(): input_cache.get_status()["size"]})
+metrics.gauge("input_cache_files", "Files held by the input cache", callback=lambda: {(): input_cache.get_status()["files"]})
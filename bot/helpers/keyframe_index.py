@@ -0,0 +1,119 @@
+import hashlib
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import List, Optional
+from config import Config
+from bot.helpers.probe_cache import ProbeCache
+
+class KeyframeIndex:
+    """Sorted keyframe timestamps of a video stream backed by a compact double array"""
+
+    def __init__(self, times: array = None):
+        self.times = times if times is not None else array("d")
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def before(self, timestamp: float) -> Optional[float]:
+        """Nearest keyframe at or before timestamp"""
+        i = bisect_right(self.times, timestamp)
+        return self.times[i - 1] if i > 0 else None
+
+    def after(self, timestamp: float) -> Optional[float]:
+        """Nearest keyframe at or after timestamp"""
+        i = bisect_left(self.times, timestamp)
+        return self.times[i] if i < len(self.times) else None
+
+    def between(self, start: float, end: float) -> List[float]:
+        """All keyframes within [start, end]"""
+        return list(self.times[bisect_left(self.times, start):bisect_right(self.times, end)])
+
+    def to_bytes(self) -> bytes:
+        return self.times.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "KeyframeIndex":
+        times = array("d")
+        times.frombytes(data)
+        return cls(times)
+
+class KeyframeIndexStore:
+    """In-memory LRU of keyframe indexes persisted to disk by file identity
+
+    Index files are evicted least recently used first once more than
+    max_files are on disk.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 256, max_files: int = 2048):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_files = max_files
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _keys(file_path: str = None, file_unique_id: str = None) -> List[str]:
+        keys = []
+        identity = ProbeCache.file_key(file_path) if file_path else None
+        if identity:
+            keys.append(hashlib.sha1("|".join(map(str, identity)).encode()).hexdigest())
+        if file_unique_id:
+            keys.append(hashlib.sha1(f"uid:{file_unique_id}".encode()).hexdigest())
+        return keys
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.kfi")
+
+    def _remember(self, key: str, index: KeyframeIndex):
+        self._entries[key] = index
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, file_path: str = None, file_unique_id: str = None) -> Optional[KeyframeIndex]:
+        """Look up an index in memory, then on disk"""
+        for key in self._keys(file_path, file_unique_id):
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+            try:
+                with open(self._path(key), "rb") as f:
+                    index = KeyframeIndex.from_bytes(f.read())
+                # mtime doubles as last use for eviction
+                os.utime(self._path(key))
+            except (OSError, ValueError):
+                continue
+            self._remember(key, index)
+            return index
+        return None
+
+    def _prune(self):
+        """Delete the least recently used index files beyond max_files"""
+        try:
+            files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".kfi")]
+        except OSError:
+            return
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def put(self, file_path: str, index: KeyframeIndex, file_unique_id: str = None):
+        """Store an index under every identity of the file"""
+        os.makedirs(self.directory, exist_ok=True)
+        for key in self._keys(file_path, file_unique_id):
+            self._remember(key, index)
+            try:
+                with open(self._path(key), "wb") as f:
+                    f.write(index.to_bytes())
+            except OSError as e:
+                print(f"Error saving keyframe index: {e}")
+        self._prune()
+
+keyframe_store = KeyframeIndexStore(Config.KEYFRAME_INDEX_DIR, Config.PROBE_CACHE_SIZE, Config.KEYFRAME_INDEX_FILES)
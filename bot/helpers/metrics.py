@@ -0,0 +1,222 @@
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+from aiohttp import web
+from config import Config
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric:
+    """Base for a labelled metric family in Prometheus text format"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        # Observations can come from pymongo's monitoring threads
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def samples(self) -> List[str]:
+        return []
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [
+                f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+                for key, value in self._values.items()
+            ]
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, callback: Callable = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+        # Callback returning {label values tuple: value}, read at scrape time
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        if self._callback:
+            try:
+                values = self._callback()
+            except Exception as e:
+                print(f"Error collecting metric {self.name}: {e}")
+                values = {}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values.items()]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [bucket counts, sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labels, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Collection of metrics rendered together for /metrics"""
+
+    def __init__(self, prefix: str = "nvt"):
+        self.prefix = prefix
+        self._metrics: List[Metric] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Tuple[str, ...] = (), callback: Callable = None) -> Gauge:
+        return self._register(Gauge(f"{self.prefix}_{name}", documentation, labels, callback=callback))
+
+    def histogram(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = ()) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", documentation, labels, buckets=buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+metrics = MetricsRegistry()
+
+DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+THROUGHPUT_BUCKETS = (256e3, 1e6, 5e6, 10e6, 25e6, 50e6, 100e6, 250e6, 500e6)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+transfer_duration = metrics.histogram(
+    "transfer_duration_seconds", "Duration of downloads and uploads", ("direction", "endpoint"), DURATION_BUCKETS
+)
+transfer_throughput = metrics.histogram(
+    "transfer_throughput_bytes_per_second", "Throughput of downloads and uploads", ("direction", "endpoint"),
+    THROUGHPUT_BUCKETS
+)
+transfer_bytes = metrics.counter("transfer_bytes_total", "Bytes transferred", ("direction", "endpoint"))
+transfer_failures = metrics.counter("transfer_failures_total", "Failed transfers", ("direction", "endpoint"))
+
+ffmpeg_duration = metrics.histogram(
+    "ffmpeg_duration_seconds", "Wall time of ffmpeg runs", ("operation",), DURATION_BUCKETS
+)
+ffmpeg_queue_wait = metrics.histogram(
+    "ffmpeg_queue_wait_seconds", "Time ffmpeg runs waited for a scheduler slot", ("operation",), DURATION_BUCKETS
+)
+ffmpeg_fps = metrics.histogram(
+    "ffmpeg_fps", "Average frames per second of finished ffmpeg runs", ("operation",),
+    (5, 10, 25, 50, 100, 200, 400, 800)
+)
+ffmpeg_speed = metrics.histogram(
+    "ffmpeg_speed_ratio", "Speed multiplier (media time / wall time) of finished ffmpeg runs", ("operation",),
+    (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+)
+ffmpeg_failures = metrics.counter("ffmpeg_failures_total", "ffmpeg runs that exited with an error", ("operation",))
+ffmpeg_processes = metrics.gauge("ffmpeg_processes", "ffmpeg processes currently running")
+
+mongo_latency = metrics.histogram(
+    "mongo_command_seconds", "Latency of MongoDB commands", ("command", "status"), LATENCY_BUCKETS
+)
+
+def observe_transfer(direction: str, endpoint: str, seconds: float, nbytes: int, success: bool = True):
+    """Record one download or upload"""
+    if not success:
+        transfer_failures.inc(direction=direction, endpoint=endpoint)
+        return
+    transfer_duration.observe(seconds, direction=direction, endpoint=endpoint)
+    transfer_bytes.inc(nbytes, direction=direction, endpoint=endpoint)
+    if seconds > 0:
+        transfer_throughput.observe(nbytes / seconds, direction=direction, endpoint=endpoint)
+
+class MetricsServer:
+    """Local HTTP server exposing the registry at /metrics"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def _handle(self, request):
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        if not self.port or self._runner:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"📈 Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+metrics_server = MetricsServer(Config.METRICS_HOST, Config.METRICS_PORT)
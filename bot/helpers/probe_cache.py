@@ -0,0 +1,161 @@
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from config import Config
+
+def _to_int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _parse_rate(rate: str) -> float:
+    """Parse ffprobe rational like '30000/1001'"""
+    try:
+        num, den = map(int, rate.split('/'))
+        return num / den if den != 0 else 0.0
+    except (AttributeError, ValueError):
+        return 0.0
+
+@dataclass
+class StreamInfo:
+    """Single stream from an ffprobe result"""
+    index: int
+    codec_type: str
+    codec_name: str
+    profile: str = ""
+    level: int = 0
+    refs: int = 0
+    bit_rate: int = 0
+    width: int = 0
+    height: int = 0
+    fps: float = 0.0
+    frame_rate: str = ""
+    pix_fmt: str = ""
+    time_base: str = ""
+    sample_rate: int = 0
+    channels: int = 0
+    channel_layout: str = ""
+
+    @classmethod
+    def from_ffprobe(cls, stream: Dict) -> "StreamInfo":
+        tags = stream.get("tags", {})
+        return cls(
+            index=_to_int(stream.get("index")),
+            codec_type=stream.get("codec_type", ""),
+            codec_name=stream.get("codec_name", ""),
+            profile=stream.get("profile", ""),
+            level=_to_int(stream.get("level")),
+            refs=_to_int(stream.get("refs")),
+            bit_rate=_to_int(stream.get("bit_rate") or tags.get("BPS")),
+            width=_to_int(stream.get("width")),
+            height=_to_int(stream.get("height")),
+            fps=_parse_rate(stream.get("r_frame_rate", "0/1")),
+            frame_rate=stream.get("r_frame_rate", ""),
+            pix_fmt=stream.get("pix_fmt", ""),
+            time_base=stream.get("time_base", ""),
+            sample_rate=_to_int(stream.get("sample_rate")),
+            channels=_to_int(stream.get("channels")),
+            channel_layout=stream.get("channel_layout", "")
+        )
+
+@dataclass
+class MediaDescriptor:
+    """Parsed ffprobe result for a media file"""
+    path: str
+    size: int
+    duration: float
+    format_name: str
+    bit_rate: int
+    streams: List[StreamInfo] = field(default_factory=list)
+    keyframe_interval: Optional[float] = None
+    raw: Dict = field(default_factory=dict, repr=False)
+
+    @property
+    def video(self) -> Optional[StreamInfo]:
+        return next((s for s in self.streams if s.codec_type == "video"), None)
+
+    @property
+    def audio(self) -> Optional[StreamInfo]:
+        return next((s for s in self.streams if s.codec_type == "audio"), None)
+
+    @classmethod
+    def from_ffprobe(cls, data: Dict, path: str) -> "MediaDescriptor":
+        format_info = data.get("format", {})
+        streams = [StreamInfo.from_ffprobe(s) for s in data.get("streams", [])]
+
+        # Average keyframe spacing from the packets ffprobe read at the start of the file
+        keyframe_interval = None
+        video = next((s for s in streams if s.codec_type == "video"), None)
+        if video:
+            keyframes = [
+                _to_float(p.get("pts_time")) for p in data.get("packets", [])
+                if p.get("stream_index") == video.index and "K" in p.get("flags", "") and "pts_time" in p
+            ]
+            if len(keyframes) > 1:
+                keyframe_interval = (keyframes[-1] - keyframes[0]) / (len(keyframes) - 1)
+
+        raw = {key: value for key, value in data.items() if key != "packets"}
+
+        return cls(
+            path=path,
+            size=_to_int(format_info.get("size")),
+            duration=_to_float(format_info.get("duration")),
+            format_name=format_info.get("format_name", ""),
+            bit_rate=_to_int(format_info.get("bit_rate")),
+            streams=streams,
+            keyframe_interval=keyframe_interval,
+            raw=raw
+        )
+
+class ProbeCache:
+    """LRU cache of ffprobe results keyed by file identity"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._unique_ids = {}
+
+    @staticmethod
+    def file_key(file_path: str) -> Optional[Tuple]:
+        """Identity of a file on disk: path + size + mtime"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns)
+
+    def get(self, file_path: str = None, file_unique_id: str = None) -> Optional[MediaDescriptor]:
+        """Look up a descriptor by file identity or Telegram file_unique_id"""
+        keys = [self.file_key(file_path) if file_path else None]
+        if file_unique_id:
+            keys.append(self._unique_ids.get(file_unique_id))
+
+        for key in keys:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        return None
+
+    def put(self, file_path: str, descriptor: MediaDescriptor, file_unique_id: str = None):
+        """Store a descriptor and evict the least recently used entries"""
+        key = self.file_key(file_path)
+        if key is None:
+            return
+        self._entries[key] = descriptor
+        self._entries.move_to_end(key)
+        if file_unique_id:
+            self._unique_ids[file_unique_id] = key
+
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._unique_ids = {uid: k for uid, k in self._unique_ids.items() if k != old_key}
+
+probe_cache = ProbeCache(Config.PROBE_CACHE_SIZE)
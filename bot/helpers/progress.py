@@ -0,0 +1,97 @@
+import asyncio
+import contextvars
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional
+
+# Task id of the job currently being processed, set by the file handler
+current_task_id = contextvars.ContextVar("current_task_id", default=None)
+
+def _parse_number(value: str, suffix: str = "") -> float:
+    """Parse ffmpeg progress values like '1.5x' or '1234.5kbits/s'"""
+    try:
+        return float(value[:-len(suffix)] if suffix and value.endswith(suffix) else value)
+    except (TypeError, ValueError):
+        return 0.0
+
+@dataclass
+class ProgressEvent:
+    """Structured progress update from an ffmpeg -progress stream"""
+    job_id: str
+    operation: str
+    task_id: Optional[str] = None
+    duration: float = 0.0
+    out_time: float = 0.0
+    frame: int = 0
+    fps: float = 0.0
+    speed: float = 0.0
+    bitrate: float = 0.0
+    total_size: int = 0
+    finished: bool = False
+
+    @property
+    def percentage(self) -> Optional[float]:
+        if self.duration <= 0:
+            return None
+        return min((self.out_time / self.duration) * 100, 100)
+
+    def update(self, fields: Dict[str, str]):
+        """Apply one key=value block from ffmpeg -progress output"""
+        out_time_us = fields.get("out_time_us") or fields.get("out_time_ms")
+        if out_time_us and out_time_us != "N/A":
+            self.out_time = max(0.0, _parse_number(out_time_us) / 1_000_000)
+        self.frame = int(_parse_number(fields.get("frame", "0")))
+        self.fps = _parse_number(fields.get("fps", "0"))
+        self.speed = _parse_number(fields.get("speed", "0").strip(), "x")
+        self.bitrate = _parse_number(fields.get("bitrate", "0").strip(), "kbits/s")
+        self.total_size = int(_parse_number(fields.get("total_size", "0")))
+        self.finished = fields.get("progress") == "end"
+
+class ProgressBus:
+    """Async publish/subscribe bus for ffmpeg progress events"""
+
+    def __init__(self):
+        self._subscribers: Dict[Optional[str], List[Callable]] = {}
+
+    def subscribe(self, callback: Callable, job_id: str = None):
+        """Subscribe to events of one job, or of every job when job_id is None"""
+        self._subscribers.setdefault(job_id, []).append(callback)
+
+    def unsubscribe(self, callback: Callable, job_id: str = None):
+        """Remove a subscription"""
+        callbacks = self._subscribers.get(job_id, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if job_id is not None and not callbacks:
+            self._subscribers.pop(job_id, None)
+
+    async def _dispatch(self, callback: Callable, event: ProgressEvent):
+        try:
+            await callback(event)
+        except Exception as e:
+            print(f"Progress subscriber error: {e}")
+
+    def publish(self, event: ProgressEvent):
+        """Deliver an event without blocking the publisher"""
+        callbacks = self._subscribers.get(None, []) + self._subscribers.get(event.job_id, [])
+        for callback in callbacks:
+            asyncio.create_task(self._dispatch(callback, event))
+
+    async def read_ffmpeg_progress(self, stream, event: ProgressEvent):
+        """Parse ffmpeg -progress key=value blocks from a stream and publish each one"""
+        fields = {}
+        while True:
+            line = await stream.readline()
+            if not line:
+                break
+
+            key, _, value = line.decode('utf-8', errors='ignore').strip().partition("=")
+            if not key:
+                continue
+            fields[key] = value
+
+            if key == "progress":
+                event.update(fields)
+                self.publish(replace(event))
+                fields = {}
+
+progress_bus = ProgressBus()
@@ -0,0 +1,110 @@
+import asyncio
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict
+from config import Config
+from bot.helpers.metrics import metrics
+
+class FFmpegScheduler:
+    """Global pool of ffmpeg slots shared by every handler"""
+
+    POLL_INTERVAL = 5
+
+    def __init__(self):
+        self.cpu_count = os.cpu_count() or 1
+        self.max_jobs = Config.FFMPEG_MAX_JOBS or max(1, self.cpu_count // max(1, Config.FFMPEG_THREADS))
+        self.threads_per_job = max(1, self.cpu_count // self.max_jobs)
+        self.max_load = Config.FFMPEG_MAX_LOAD or self.cpu_count * 1.5
+        self.running = 0
+        self._queue = deque()
+        self._condition = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the loop pyrogram is running on
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _has_capacity(self) -> bool:
+        """Check slot count and system load before admitting a job"""
+        if self.running == 0:
+            return True
+        if self.running >= self.max_jobs:
+            return False
+        try:
+            return os.getloadavg()[0] < self.max_load
+        except (OSError, AttributeError):
+            return True
+
+    async def _show_position(self, status_msg, operation: str, position: int):
+        """Show queue position on the task's status message"""
+        try:
+            await status_msg.edit_text(
+                f"⏳ **{operation} - Queued**\n\n"
+                f"📋 Queue Position: {position}\n"
+                f"⚙️ Running Jobs: {self.running}/{self.max_jobs}"
+            )
+        except:
+            pass
+
+    async def acquire(self, status_msg=None, operation: str = "Processing") -> int:
+        """Wait for a free ffmpeg slot and return the thread budget for the job"""
+        condition = self._get_condition()
+        ticket = object()
+        last_position = 0
+
+        async with condition:
+            self._queue.append(ticket)
+            try:
+                while not (self._queue[0] is ticket and self._has_capacity()):
+                    position = self._queue.index(ticket) + 1
+                    if status_msg and position != last_position:
+                        last_position = position
+                        asyncio.create_task(self._show_position(status_msg, operation, position))
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout=self.POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                self._queue.remove(ticket)
+                condition.notify_all()
+                raise
+
+            self._queue.popleft()
+            self.running += 1
+            condition.notify_all()
+
+        return self.threads_per_job
+
+    async def release(self):
+        """Free a slot and wake up queued jobs"""
+        condition = self._get_condition()
+        async with condition:
+            self.running -= 1
+            condition.notify_all()
+
+    @asynccontextmanager
+    async def job(self, status_msg=None, operation: str = "Processing"):
+        """Hold an ffmpeg slot for the duration of the block"""
+        threads = await self.acquire(status_msg, operation)
+        try:
+            yield threads
+        finally:
+            await self.release()
+
+    def get_status(self) -> Dict:
+        """Get current scheduler status"""
+        return {
+            "running": self.running,
+            "queued": len(self._queue),
+            "max_jobs": self.max_jobs,
+            "threads_per_job": self.threads_per_job
+        }
+
+ffmpeg_scheduler = FFmpegScheduler()
+
+metrics.gauge(
+    "ffmpeg_queue_depth", "ffmpeg runs waiting for a scheduler slot",
+    callback=lambda: {(): ffmpeg_scheduler.get_status()["queued"]}
+)
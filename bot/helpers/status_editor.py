@@ -0,0 +1,153 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+from pyrogram.errors import FloodWait, MessageNotModified
+from config import Config
+
+class StatusMessage:
+    """Status message whose edits are queued on the edit scheduler instead of sent inline"""
+
+    def __init__(self, message, editor: "StatusEditor"):
+        self._message = message
+        self._editor = editor
+
+    async def edit_text(self, text: str, **kwargs):
+        self._editor.submit(self._message, text, **kwargs)
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._message, name)
+
+class StatusEditor:
+    """Coalescing, flood-aware scheduler for status message edits
+
+    Only the latest text per message is kept, edits are spaced per chat and
+    capped globally, FloodWait pauses all edits, and unchanged text is dropped.
+    Callers never wait on Telegram.
+    """
+
+    SENT_HISTORY = 1024
+
+    def __init__(self, chat_interval: float, global_rate: int):
+        self.chat_interval = chat_interval
+        self.global_rate = max(1, global_rate)
+        # (chat_id, message_id) -> (message, text, kwargs)
+        self._pending = OrderedDict()
+        self._sent = OrderedDict()
+        self._in_flight = set()
+        self._chat_ready: Dict[int, float] = {}
+        self._send_times = deque()
+        self._flood_until = 0.0
+        self._wakeup = None
+        self._worker = None
+        self.stats = {"sent": 0, "coalesced": 0, "dropped": 0, "flood_waits": 0}
+
+    def wrap(self, message) -> StatusMessage:
+        """Route a status message's edits through the scheduler"""
+        return StatusMessage(message, self)
+
+    def submit(self, message, text: str, **kwargs):
+        """Queue an edit; a newer edit of the same message replaces it"""
+        key = (message.chat.id, message.id)
+        if key in self._pending:
+            self.stats["coalesced"] += 1
+        elif not kwargs and key not in self._in_flight and self._sent.get(key) == text:
+            self.stats["dropped"] += 1
+            return
+
+        self._pending[key] = (message, text, kwargs)
+        self._ensure_worker()
+        self._wakeup.set()
+
+    def _ensure_worker(self):
+        # Created lazily so they bind to the loop pyrogram is running on
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def _next_slot(self, now: float) -> float:
+        """Earliest time the global budget allows another edit"""
+        while self._send_times and now - self._send_times[0] >= 1:
+            self._send_times.popleft()
+        if len(self._send_times) < self.global_rate:
+            return now
+        return self._send_times[0] + 1
+
+    def _dispatch(self) -> Optional[float]:
+        """Start every edit that is allowed now; return seconds until the next one could be"""
+        now = time.monotonic()
+        if now < self._flood_until:
+            return self._flood_until - now
+
+        next_at = None
+        for key in list(self._pending):
+            if key in self._in_flight:
+                continue
+
+            slot = self._next_slot(now)
+            if slot > now:
+                next_at = slot
+                break
+
+            chat_at = self._chat_ready.get(key[0], 0)
+            if chat_at > now:
+                next_at = chat_at if next_at is None else min(next_at, chat_at)
+                continue
+
+            message, text, kwargs = self._pending.pop(key)
+            if not kwargs and self._sent.get(key) == text:
+                self.stats["dropped"] += 1
+                continue
+
+            self._chat_ready[key[0]] = now + self.chat_interval
+            self._send_times.append(now)
+            self._in_flight.add(key)
+            asyncio.create_task(self._send(key, message, text, kwargs))
+
+        self._chat_ready = {chat: at for chat, at in self._chat_ready.items() if at > now}
+        return None if next_at is None else max(0.0, next_at - now)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            delay = self._dispatch()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _remember(self, key, text: str):
+        self._sent[key] = text
+        self._sent.move_to_end(key)
+        while len(self._sent) > self.SENT_HISTORY:
+            self._sent.popitem(last=False)
+
+    async def _send(self, key, message, text: str, kwargs: Dict):
+        try:
+            await message.edit_text(text, **kwargs)
+            self._remember(key, text)
+            self.stats["sent"] += 1
+        except FloodWait as e:
+            self.stats["flood_waits"] += 1
+            self._flood_until = max(self._flood_until, time.monotonic() + e.value)
+            # Retry later unless a newer text has been queued meanwhile
+            self._pending.setdefault(key, (message, text, kwargs))
+        except MessageNotModified:
+            self._remember(key, text)
+        except Exception as e:
+            print(f"Status edit failed: {e}")
+        finally:
+            self._in_flight.discard(key)
+            self._wakeup.set()
+
+    def get_status(self) -> Dict:
+        """Get current scheduler status"""
+        return {
+            **self.stats,
+            "pending": len(self._pending),
+            "flood_wait": max(0, int(self._flood_until - time.monotonic()))
+        }
+
+status_editor = StatusEditor(Config.STATUS_EDIT_INTERVAL, Config.STATUS_EDIT_RATE)
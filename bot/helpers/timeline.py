@@ -0,0 +1,64 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+# Timeline of the task currently being processed, set by the file handler
+current_timeline = contextvars.ContextVar("current_timeline", default=None)
+
+class TaskTimeline:
+    """Stage spans of one task, kept in memory and written to the task document when it ends
+
+    Each span records its stage, offset from the task start and duration in
+    seconds, plus stage specific attributes such as bytes or ffmpeg speed.
+    """
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self.started_at = time.time()
+        self.spans: List[Dict] = []
+
+    def add(self, stage: str, started_at: float, **attrs):
+        """Record a span that started at started_at and ends now"""
+        now = time.time()
+        span = {
+            "stage": stage,
+            "start": round(started_at - self.started_at, 3),
+            "duration": round(now - started_at, 3)
+        }
+        span.update({key: value for key, value in attrs.items() if value is not None})
+        self.spans.append(span)
+
+    def to_dict(self) -> Dict:
+        return {"duration": round(time.time() - self.started_at, 3), "spans": self.spans}
+
+def start_timeline(task_id: str) -> TaskTimeline:
+    """Begin collecting spans for a task in the current context"""
+    timeline = TaskTimeline(task_id)
+    current_timeline.set(timeline)
+    return timeline
+
+def record_span(stage: str, started_at: float, **attrs):
+    """Add a span to the current task's timeline; a no-op outside of a task"""
+    timeline = current_timeline.get()
+    if timeline:
+        timeline.add(stage, started_at, **attrs)
+
+@contextmanager
+def span(stage: str, **attrs):
+    """Time a block as a span; attributes can be added to the yielded dict"""
+    started_at = time.time()
+    try:
+        yield attrs
+    finally:
+        record_span(stage, started_at, **attrs)
+
+def summarize(spans: List[Dict]) -> Dict[str, Dict]:
+    """Total duration, count and bytes per stage, in first-seen order"""
+    stages = {}
+    for item in spans:
+        stage = stages.setdefault(item["stage"], {"duration": 0.0, "count": 0, "bytes": 0})
+        stage["duration"] += item.get("duration", 0)
+        stage["count"] += 1
+        stage["bytes"] += item.get("bytes", 0)
+    return stages
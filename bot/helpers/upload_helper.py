@@ -1,16 +1,21 @@
 import os
-import aiohttp
+import uuid
 import aiofiles
 from pyrogram import Client
 from config import Config
 import time
+from bot.database import db
 from bot.utils.helpers import format_size, format_time
+from bot.helpers.http_client import http_client
+from bot.helpers.metrics import observe_transfer
+from bot.helpers.timeline import record_span
 
 class UploadHelper:
     @staticmethod
     async def upload_to_telegram(client: Client, chat_id: int, file_path: str, thumb_path: str = None,
-                                caption: str = "", as_document: bool = True, status_msg=None):
-        """Upload file to Telegram with progress tracking"""
+                                caption: str = "", as_document: bool = True, status_msg=None,
+                                cache_key: str = None):
+        """Upload file to Telegram with progress tracking, recording the file_id under cache_key"""
         try:
             start_time = time.time()
             last_update = [0]
@@ -36,7 +41,7 @@ class UploadHelper:
                         pass
 
             if as_document:
-                return await client.send_document(
+                sent = await client.send_document(
                     chat_id=chat_id,
                     document=file_path,
                     thumb=thumb_path,
@@ -44,7 +49,7 @@ class UploadHelper:
                     progress=progress
                 )
             else:
-                return await client.send_video(
+                sent = await client.send_video(
                     chat_id=chat_id,
                     video=file_path,
                     thumb=thumb_path,
@@ -52,8 +57,20 @@ class UploadHelper:
                     progress=progress,
                     supports_streaming=True
                 )
+
+            observe_transfer("upload", "telegram", time.time() - start_time, os.path.getsize(file_path))
+            record_span("upload", start_time, endpoint="telegram", bytes=os.path.getsize(file_path))
+            media = sent and (sent.video or sent.document)
+            if cache_key and media and Config.RESULT_CACHE:
+                try:
+                    await db.save_cached_result(cache_key, media.file_id)
+                except Exception as e:
+                    print(f"Error saving cached result: {e}")
+            return sent
         except Exception as e:
             print(f"Error uploading to Telegram: {e}")
+            observe_transfer("upload", "telegram", 0, 0, success=False)
+            record_span("upload", start_time, endpoint="telegram", ok=False)
             if status_msg:
                 try:
                     await status_msg.edit_text(f"❌ **Upload Error:**\n{str(e)}")
@@ -61,44 +78,103 @@ class UploadHelper:
                     pass
             return None
 
+    @staticmethod
+    async def send_cached_result(client: Client, chat_id: int, cache_key: str, caption: str = ""):
+        """Re-send a previously uploaded output by file_id; returns None on a cache miss"""
+        if not Config.RESULT_CACHE:
+            return None
+        try:
+            cached = await db.get_cached_result(cache_key)
+            if not cached:
+                return None
+            start_time = time.time()
+            sent = await client.send_cached_media(chat_id, cached["file_id"], caption=caption)
+            record_span("upload", start_time, endpoint="cached")
+            return sent
+        except Exception as e:
+            # Stale or inaccessible file_id: drop it and process normally
+            print(f"Error sending cached result: {e}")
+            await db.delete_cached_result(cache_key)
+            return None
+
     @staticmethod
     async def upload_to_gofile(file_path: str, status_msg=None):
-        """Upload file to GoFile server"""
+        """Upload file to GoFile server, streaming it from disk"""
         try:
             if status_msg:
                 await status_msg.edit_text("⏫ **Uploading to GoFile...**\n\nGetting server...")
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get("https://api.gofile.io/getServer") as response:
-                    if response.status != 200:
-                        return None
-                    data = await response.json()
-                    if data["status"] != "ok":
-                        return None
-                    server = data["data"]["server"]
+            session = http_client.session
 
-                if status_msg:
-                    await status_msg.edit_text("⏫ **Uploading to GoFile...**\n\nUploading file...")
+            async with session.get("https://api.gofile.io/getServer") as response:
+                if response.status != 200:
+                    return None
+                data = await response.json()
+                if data["status"] != "ok":
+                    return None
+                server = data["data"]["server"]
+
+            file_size = os.path.getsize(file_path)
+            file_name = os.path.basename(file_path).replace('"', '%22')
+
+            # Multipart body built by hand so the file streams in chunks with a known Content-Length
+            boundary = uuid.uuid4().hex
+            head = (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="file"; filename="{file_name}"\r\n'
+                f"Content-Type: application/octet-stream\r\n\r\n"
+            ).encode()
+            tail = f"\r\n--{boundary}--\r\n".encode()
 
-                file_size = os.path.getsize(file_path)
+            start_time = time.time()
+            last_update = [0]
 
+            async def body():
+                yield head
+                uploaded = 0
                 async with aiofiles.open(file_path, 'rb') as f:
-                    file_data = await f.read()
+                    while True:
+                        chunk = await f.read(http_client.chunk_size)
+                        if not chunk:
+                            break
+                        yield chunk
+                        uploaded += len(chunk)
 
-                form = aiohttp.FormData()
-                form.add_field('file', file_data, filename=os.path.basename(file_path))
+                        if status_msg and (time.time() - last_update[0]) > 2:
+                            last_update[0] = time.time()
+                            percentage = (uploaded / file_size) * 100
+                            elapsed = time.time() - start_time
+                            speed = uploaded / (elapsed if elapsed > 0 else 1)
+                            eta = (file_size - uploaded) / speed if speed > 0 else 0
+                            progress_text = (
+                                f"⏫ **Uploading to GoFile...**\n\n"
+                                f"📊 Progress: {percentage:.1f}%\n"
+                                f"📦 Size: {format_size(uploaded)} / {format_size(file_size)}\n"
+                                f"⚡ Speed: {format_size(speed)}/s\n"
+                                f"⏰ ETA: {format_time(eta)}"
+                            )
+                            try:
+                                await status_msg.edit_text(progress_text)
+                            except:
+                                pass
+                yield tail
 
-                upload_url = f"https://{server}.gofile.io/uploadFile"
+            headers = {
+                "Content-Type": f"multipart/form-data; boundary={boundary}",
+                "Content-Length": str(len(head) + file_size + len(tail))
+            }
+            upload_url = f"https://{server}.gofile.io/uploadFile"
 
-                async with session.post(upload_url, data=form) as response:
-                    if response.status != 200:
-                        return None
+            async with session.post(upload_url, data=body(), headers=headers) as response:
+                result = await response.json() if response.status == 200 else None
 
-                    result = await response.json()
-                    if result["status"] == "ok":
-                        return result["data"]["downloadPage"]
-                    return None
+            if result and result["status"] == "ok":
+                observe_transfer("upload", "gofile", time.time() - start_time, file_size)
+                record_span("upload", start_time, endpoint="gofile", bytes=file_size)
+                return result["data"]["downloadPage"]
+            observe_transfer("upload", "gofile", 0, 0, success=False)
+            return None
         except Exception as e:
             print(f"Error uploading to GoFile: {e}")
+            observe_transfer("upload", "gofile", 0, 0, success=False)
             return None
-            
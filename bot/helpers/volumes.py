@@ -0,0 +1,99 @@
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+import psutil
+from config import Config
+from bot.helpers.metrics import metrics
+
+class Volume:
+    """One scratch mount point from DOWNLOAD_DIR"""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.device = os.stat(root).st_dev
+        self.disk = self._disk_name(root)
+
+    @staticmethod
+    def _disk_name(root: str) -> Optional[str]:
+        """Block device name (as used by psutil.disk_io_counters) backing a path"""
+        path = os.path.realpath(root)
+        best = None
+        try:
+            partitions = psutil.disk_partitions(all=False)
+        except Exception:
+            return None
+        for partition in partitions:
+            mount = partition.mountpoint
+            if path == mount or path.startswith(mount.rstrip(os.sep) + os.sep):
+                if best is None or len(mount) > len(best.mountpoint):
+                    best = partition
+        if not best or not best.device.startswith("/dev/"):
+            return None
+        # /dev/mapper/* symlinks resolve to the dm-N name the kernel reports stats under
+        return os.path.basename(os.path.realpath(best.device))
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def free(self) -> int:
+        return shutil.disk_usage(self.root).free
+
+class VolumePool:
+    """Scratch volumes ranked by free space and current disk utilization"""
+
+    SAMPLE_INTERVAL = 2
+
+    def __init__(self, roots: List[str]):
+        self.volumes = [Volume(root) for root in roots]
+        self._busy: Dict[str, float] = {}
+        self._utilization: Dict[str, float] = {}
+        self._sampled_at = 0.0
+
+    @property
+    def primary(self) -> Volume:
+        return self.volumes[0]
+
+    def _sample(self):
+        """Refresh per-disk utilization from busy time deltas"""
+        now = time.monotonic()
+        if now - self._sampled_at < self.SAMPLE_INTERVAL:
+            return
+        try:
+            counters = psutil.disk_io_counters(perdisk=True) or {}
+        except Exception:
+            return
+
+        elapsed_ms = (now - self._sampled_at) * 1000
+        for volume in self.volumes:
+            stats = counters.get(volume.disk) if volume.disk else None
+            busy = getattr(stats, "busy_time", None)
+            if busy is None:
+                continue
+            if volume.disk in self._busy and self._sampled_at:
+                self._utilization[volume.disk] = min(1.0, (busy - self._busy[volume.disk]) / elapsed_ms)
+            self._busy[volume.disk] = busy
+        self._sampled_at = now
+
+    def utilization(self, volume: Volume) -> float:
+        """Fraction of time the volume's disk was busy over the last sample window"""
+        self._sample()
+        return self._utilization.get(volume.disk, 0.0)
+
+    def rank(self, candidates: List[Volume], active: Dict[str, int] = None) -> List[Volume]:
+        """Least loaded first, then most free space; tasks already placed count as load"""
+        active = active or {}
+        return sorted(
+            candidates,
+            key=lambda v: (round(self.utilization(v) + 0.25 * active.get(v.root, 0), 2), -v.free())
+        )
+
+volume_pool = VolumePool(Config.DOWNLOAD_DIRS)
+
+def _disk_usage(field: str) -> Dict:
+    return {(volume.root,): getattr(shutil.disk_usage(volume.root), field) for volume in volume_pool.volumes}
+
+metrics.gauge("disk_total_bytes", "Size of each DOWNLOAD_DIR volume", ("volume",), lambda: _disk_usage("total"))
+metrics.gauge("disk_used_bytes", "Used space on each DOWNLOAD_DIR volume", ("volume",), lambda: _disk_usage("used"))
+metrics.gauge("disk_free_bytes", "Free space on each DOWNLOAD_DIR volume", ("volume",), lambda: _disk_usage("free"))
@@ -0,0 +1,154 @@
+import os
+import shutil
+import uuid
+from typing import Dict, Optional
+from config import Config
+from bot.helpers.input_cache import input_cache
+from bot.helpers.metrics import metrics
+from bot.helpers.volumes import Volume, volume_pool
+from bot.utils.helpers import format_size
+
+class InsufficientSpaceError(Exception):
+    """Not enough free disk space to admit a task"""
+
+class Workspace:
+    """Scratch directory owned by a single task"""
+
+    def __init__(self, path: str, volume: Volume, input_volume: Volume, input_size: int, output_size: int):
+        self.path = path
+        self.volume = volume
+        # Where inputs downloaded for this task should be placed
+        self.input_volume = input_volume
+        self.input_size = input_size
+        self.output_size = output_size
+
+    def file(self, name: str) -> str:
+        """Path of a file inside the workspace"""
+        return os.path.join(self.path, name)
+
+    def usage(self) -> int:
+        """Bytes currently written to the workspace"""
+        total = 0
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+class WorkspaceManager:
+    """Creates per-task scratch directories with free space admission and cleanup"""
+
+    SUBDIR = ".tasks"
+
+    def __init__(self, reserve: int):
+        self.reserve = reserve
+        self._active: Dict[str, Workspace] = {}
+
+    def _outstanding(self, volume: Volume) -> int:
+        """Space on a volume promised to running tasks that they have not written yet"""
+        total = 0
+        for workspace in self._active.values():
+            if workspace.volume is volume:
+                total += max(0, workspace.output_size - workspace.usage())
+            if workspace.input_volume is volume:
+                total += workspace.input_size
+        return total
+
+    def available(self, volume: Volume) -> int:
+        """Free bytes on a volume not yet promised to a running task"""
+        return volume.free() - self._outstanding(volume) - self.reserve
+
+    def _placements(self) -> Dict[str, int]:
+        """Running tasks per volume root"""
+        counts = {}
+        for workspace in self._active.values():
+            counts[workspace.volume.root] = counts.get(workspace.volume.root, 0) + 1
+            if workspace.input_size and workspace.input_volume is not workspace.volume:
+                counts[workspace.input_volume.root] = counts.get(workspace.input_volume.root, 0) + 1
+        return counts
+
+    def _pick(self, size: int, avoid: Volume = None) -> Optional[Volume]:
+        """Least loaded volume with room for size, preferring a different device than avoid"""
+        candidates = [volume for volume in volume_pool.volumes if self.available(volume) >= size]
+        ranked = volume_pool.rank(candidates, self._placements())
+        if avoid is not None:
+            separate = [volume for volume in ranked if volume.device != avoid.device]
+            if separate:
+                return separate[0]
+        return ranked[0] if ranked else None
+
+    def _place(self, input_size: int, output_size: int):
+        """Choose (output volume, input volume) or None if nothing fits"""
+        if Config.SPLIT_IO_VOLUMES and input_size and len(volume_pool.volumes) > 1:
+            volume = self._pick(output_size)
+            input_volume = self._pick(input_size, avoid=volume) if volume else None
+            if volume and input_volume and (input_volume is not volume or self.available(volume) >= input_size + output_size):
+                return volume, input_volume
+
+        volume = self._pick(input_size + output_size)
+        return (volume, volume) if volume else None
+
+    def create(self, name: str, input_size: int = 0, output_size: int = 0) -> Workspace:
+        """Admit a task that will download input_size and write output_size bytes"""
+        placement = self._place(input_size, output_size)
+        if placement is None:
+            # Idle cached inputs are the cheapest space to reclaim
+            best = max(self.available(volume) for volume in volume_pool.volumes)
+            input_cache.free(input_size + output_size - best)
+            placement = self._place(input_size, output_size)
+        if placement is None:
+            best = max(self.available(volume) for volume in volume_pool.volumes)
+            raise InsufficientSpaceError(
+                f"Not enough disk space: need {format_size(input_size + output_size)}, "
+                f"available {format_size(max(0, best))}"
+            )
+
+        volume, input_volume = placement
+        path = volume.path(self.SUBDIR, f"{name}_{uuid.uuid4().hex[:8]}")
+        os.makedirs(path)
+        workspace = Workspace(path, volume, input_volume, input_size, output_size)
+        self._active[path] = workspace
+        return workspace
+
+    def inputs_ready(self, workspace: Workspace):
+        """Drop the input part of a reservation once the inputs sit in the input cache"""
+        workspace.input_size = 0
+
+    def release(self, workspace: Optional[Workspace]):
+        """Delete a workspace and everything in it"""
+        if not workspace:
+            return
+        self._active.pop(workspace.path, None)
+        shutil.rmtree(workspace.path, ignore_errors=True)
+
+    def sweep(self) -> int:
+        """Remove workspaces not owned by a running task, e.g. left behind by a crash"""
+        removed = 0
+        for volume in volume_pool.volumes:
+            root = volume.path(self.SUBDIR)
+            if not os.path.isdir(root):
+                continue
+            for name in os.listdir(root):
+                path = os.path.join(root, name)
+                if path in self._active:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+                removed += 1
+        return removed
+
+    def get_status(self) -> Dict:
+        """Get current workspace usage"""
+        return {
+            "active": len(self._active),
+            "volumes": len(volume_pool.volumes),
+            "available": sum(max(0, self.available(volume)) for volume in volume_pool.volumes)
+        }
+
+workspace_manager = WorkspaceManager(Config.DISK_RESERVE)
+
+metrics.gauge("workspaces_active", "Tasks currently holding a workspace", callback=lambda: {(): len(workspace_manager._active)})
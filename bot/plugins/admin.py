@@ -1,8 +1,14 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message
 from bot.database import db
-from bot.utils.helpers import is_admin
+from bot.helpers.scheduler import ffmpeg_scheduler
+from bot.helpers.input_cache import input_cache
+from bot.helpers.workspace import workspace_manager
+from bot.helpers.status_editor import status_editor
+from bot.helpers.timeline import summarize
+from bot.utils.helpers import is_admin, format_size
 from config import Config
+from datetime import datetime, timedelta
 
 @Client.on_message(filters.command("ban") & filters.user(Config.OWNER_ID))
 async def ban_user(client: Client, message: Message):
@@ -72,6 +78,10 @@ async def stats(client: Client, message: Message):
     total_users = await db.users.count_documents({})
     banned_users = await db.users.count_documents({"is_banned": True})
     active_tasks = await db.tasks.count_documents({"status": "processing"})
+    queue = ffmpeg_scheduler.get_status()
+    cache = input_cache.get_status()
+    workspaces = workspace_manager.get_status()
+    edits = status_editor.get_status()
 
     stats_text = f"""
 📊 **Bot Statistics**
@@ -84,9 +94,83 @@ async def stats(client: Client, message: Message):
 ⚙️ **Tasks:**
 • Currently Running: {active_tasks}
 
+🎞️ **FFmpeg Queue:**
+• Running: {queue['running']}/{queue['max_jobs']}
+• Queued: {queue['queued']}
+• Threads/Job: {queue['threads_per_job']}
+
+💾 **Input Cache:**
+• Files: {cache['files']} ({cache['in_use']} in use)
+• Size: {format_size(cache['size'])} / {format_size(cache['max_size'])}
+
+🗂️ **Workspaces:**
+• Active: {workspaces['active']}
+• Free Disk: {format_size(workspaces['available'])} ({workspaces['volumes']} volumes)
+
+✏️ **Status Edits:**
+• Sent: {edits['sent']} | Coalesced: {edits['coalesced']} | Dropped: {edits['dropped']}
+• Pending: {edits['pending']} | FloodWaits: {edits['flood_waits']}
+
 🔧 **System:**
 • Authorized Groups: {len(Config.AUTHORIZED_GROUPS)}
 • Sudo Users: {len(Config.SUDO_USERS)}
 """
 
     await message.reply_text(stats_text)
+
+def _format_span(span: dict) -> str:
+    """One timeline span as a compact line"""
+    details = [span["stage"]]
+    for key in ("operation", "endpoint"):
+        if span.get(key):
+            details.append(str(span[key]))
+    line = f"`+{span['start']:.1f}s` {' '.join(details)} **{span['duration']:.1f}s**"
+    if span.get("bytes"):
+        line += f" • {format_size(span['bytes'])}"
+    if span.get("speed"):
+        line += f" • {span['speed']:.2f}x"
+    if span.get("fps"):
+        line += f" • {span['fps']:.0f} fps"
+    if span.get("ok") is False:
+        line += " ❌"
+    return line
+
+@Client.on_message(filters.command("timeline") & filters.user(Config.OWNER_ID))
+async def timeline(client: Client, message: Message):
+    """Show a task's stage breakdown, or the slowest tasks of the last hour"""
+    try:
+        if len(message.command) > 1:
+            task = await db.get_task(message.command[1])
+            if not task or not task.get("timeline"):
+                await message.reply_text("❌ No timeline recorded for this task")
+                return
+
+            data = task["timeline"]
+            text = f"🕒 **Task Timeline**\n`{task['_id']}` • {task['task_type']} • {data['duration']:.1f}s\n\n**Stages:**\n"
+            for stage, totals in summarize(data["spans"]).items():
+                text += f"• {stage}: {totals['duration']:.1f}s ({totals['count']}×"
+                text += f", {format_size(totals['bytes'])})\n" if totals["bytes"] else ")\n"
+
+            # Stay well inside Telegram's message length limit
+            spans = data["spans"][:40]
+            text += "\n**Spans:**\n" + "\n".join(_format_span(span) for span in spans)
+            if len(data["spans"]) > len(spans):
+                text += f"\n… {len(data['spans']) - len(spans)} more"
+            await message.reply_text(text)
+            return
+
+        tasks = await db.get_slowest_tasks(datetime.utcnow() - timedelta(hours=1))
+        if not tasks:
+            await message.reply_text("ℹ️ No finished tasks in the last hour")
+            return
+
+        text = "🐢 **Slowest Tasks (last hour)**\n\n"
+        for i, task in enumerate(tasks, 1):
+            data = task["timeline"]
+            stages = sorted(summarize(data["spans"]).items(), key=lambda item: -item[1]["duration"])
+            breakdown = ", ".join(f"{stage} {totals['duration']:.1f}s" for stage, totals in stages[:3])
+            text += f"{i}. `{task['_id']}` {task['task_type']} — **{data['duration']:.1f}s**\n   {breakdown}\n"
+        text += "\nUse /timeline <task_id> for details"
+        await message.reply_text(text)
+    except Exception as e:
+        await message.reply_text(f"❌ Error: {str(e)}")
@@ -19,6 +19,7 @@ ABOUT_TEXT = f"""
 ✅ Video Trimming
 ✅ Sample Generation
 ✅ Detailed MediaInfo
+✅ Screenshots & Contact Sheets
 
 **Technology:**
 • Built with Pyrogram & Python
@@ -240,7 +241,16 @@ Tool select करने के बाद required files भेजें
     elif data.startswith("quality_"):
         quality = data.replace("quality_", "")
 
-        if quality == "custom":
+        if quality == "ladder":
+            await db.set_encoding_settings(user_id, {"preset_name": "ladder", "ladder": []})
+            await query.message.edit_text(
+                "📶 **Multi Quality Encoding**\\n\\n"
+                "एक ही बार में कई qualities encode करें।\\nQualities select करें:",
+                reply_markup=ladder_quality_buttons([])
+            )
+            await query.answer()
+
+        elif quality == "custom":
             await query.message.edit_text(
                 "⚙️ **Custom Encoding Settings**\\n\\nCustom parameters configure करें:",
                 reply_markup=encoding_settings_buttons()
@@ -258,6 +268,42 @@ Tool select करने के बाद required files भेजें
             )
             await query.answer(f"✅ {quality.upper()} preset selected!")
 
+    elif data == "ladder_done":
+        user = await db.get_user(user_id)
+        enc_settings = user.get("encoding_settings") or {}
+
+        if not enc_settings.get("ladder"):
+            await query.answer("⚠️ कम से कम एक quality select करें!", show_alert=True)
+            return
+
+        qualities = ", ".join(q.upper() for q in enc_settings["ladder"])
+        await query.message.edit_text(
+            f"✅ **Multi Quality Selected**\\n\\n{qualities}\\n\\n"
+            "📹 अब video file भेजें encoding के लिए।",
+            reply_markup=back_to_video_tools()
+        )
+        await query.answer("✅ Ready! Video file भेजें।")
+
+    elif data.startswith("ladder_"):
+        quality = data.replace("ladder_", "", 1)
+        if quality not in Config.VIDEO_PRESETS:
+            await query.answer()
+            return
+
+        user = await db.get_user(user_id)
+        enc_settings = user.get("encoding_settings") or {}
+        selected = enc_settings.get("ladder", [])
+
+        if quality in selected:
+            selected.remove(quality)
+            await query.answer(f"➖ {quality.upper()} removed")
+        else:
+            selected.append(quality)
+            await query.answer(f"➕ {quality.upper()} added")
+
+        await db.set_encoding_settings(user_id, {"preset_name": "ladder", "ladder": selected})
+        await query.message.edit_reply_markup(ladder_quality_buttons(selected))
+
     elif data == "enc_done":
         user = await db.get_user(user_id)
         enc_settings = user.get("encoding_settings")
@@ -328,4 +374,25 @@ Tool select करने के बाद required files भेजें
             reply_markup=back_to_video_tools()
         )
         await query.answer("✅ MediaInfo mode selected! Video भेजें।")
-    
+
+    elif data == "tool_screenshots":
+        await db.set_video_tool(user_id, "screenshots")
+        await query.message.edit_text(
+            "📸 **Screenshots**\\n\\nMode select करें:",
+            reply_markup=screenshot_buttons()
+        )
+
+    elif data.startswith("ss_"):
+        mode = data.replace("ss_", "")
+        settings = {
+            "mode": "scene" if mode == "scene" else "interval",
+            "tile": mode == "sheet"
+        }
+        await db.set_video_tool(user_id, "screenshots")
+        await db.set_screenshot_settings(user_id, settings)
+        await query.message.edit_text(
+            f"📸 **{'Contact Sheet' if settings['tile'] else 'Screenshots'}**\\n\\n"
+            f"📹 Video file भेजें {Config.SCREENSHOT_COUNT} screenshots के लिए।",
+            reply_markup=back_to_video_tools()
+        )
+        await query.answer("✅ Screenshot mode selected! Video भेजें।")
@@ -1,25 +1,62 @@
 from pyrogram import Client, filters
-from pyrogram.types import Message
+from pyrogram.types import Message, InputMediaPhoto
 from bot.database import db
 from bot.helpers.ffmpeg_helper import FFmpegHelper
 from bot.helpers.download_helper import DownloadHelper
+from bot.helpers.input_cache import input_cache
+from bot.helpers.workspace import workspace_manager
+from bot.helpers.status_editor import status_editor
 from bot.helpers.upload_helper import UploadHelper
+from bot.helpers.progress import ProgressEvent, current_task_id, progress_bus
+from bot.helpers.timeline import current_timeline, span, start_timeline
 from bot.utils.helpers import (
     is_video_file, is_audio_file, is_subtitle_file,
-    is_authorized_group, can_use_in_private, format_size
+    is_authorized_group, can_use_in_private, format_size, get_media, result_cache_key
 )
 from config import Config
 import os
 import asyncio
+from urllib.parse import unquote, urlparse
 
-@Client.on_message(filters.video | filters.document | filters.audio | filters.photo)
-async def handle_file(client: Client, message: Message):
-    """Handle incoming video/document/audio/photo files"""
+_saved_progress = {}
+
+async def save_task_progress(event: ProgressEvent):
+    """Persist ffmpeg progress on the task document so /s can show it"""
+    # Every job ends with a finished event, including failed and killed ones
+    if event.finished:
+        _saved_progress.pop(event.job_id, None)
+
+    if not event.task_id or event.percentage is None:
+        return
+
+    progress = int(event.percentage)
+    if not event.finished:
+        if progress < _saved_progress.get(event.job_id, -5) + 5:
+            return
+        _saved_progress[event.job_id] = progress
+
+    await db.update_task_progress(event.task_id, progress)
+
+progress_bus.subscribe(save_task_progress)
+
+async def save_task_timeline():
+    """Write the current task's spans to its document once, after cleanup"""
+    timeline = current_timeline.get()
+    if not timeline:
+        return
+    current_timeline.set(None)
+    try:
+        await db.save_task_timeline(timeline.task_id, timeline.to_dict())
+    except Exception as e:
+        print(f"Error saving task timeline: {e}")
+
+async def get_active_user(message: Message):
+    """Return the sender's user document if they may start a task here, replying with the reason otherwise"""
     user_id = message.from_user.id
     chat_id = message.chat.id
 
     if await db.is_user_banned(user_id):
-        return
+        return None
 
     if message.chat.type == "private":
         if not await can_use_in_private(user_id):
@@ -28,13 +65,13 @@ async def handle_file(client: Client, message: Message):
                 "Bot authorized groups में काम करता है।\\n"
                 f"Owner: `{Config.OWNER_ID}`"
             )
-            return
+            return None
     else:
         if not await is_authorized_group(chat_id):
-            return
+            return None
 
         if not await db.is_user_active(user_id, chat_id):
-            return
+            return None
 
     user = await db.get_user(user_id)
     if not user:
@@ -48,6 +85,19 @@ async def handle_file(client: Client, message: Message):
             "पहले से ही एक task चल रहा है।\\n"
             "/stop से cancel करें।"
         )
+        return None
+
+    return user
+
+@Client.on_message(filters.video | filters.document | filters.audio | filters.photo)
+async def handle_file(client: Client, message: Message):
+    """Handle incoming video/document/audio/photo files"""
+    user_id = message.from_user.id
+    current_task_id.set(None)
+    current_timeline.set(None)
+
+    user = await get_active_user(message)
+    if not user:
         return
 
     video_tool = user.get("video_tool_selected")
@@ -99,6 +149,61 @@ async def handle_file(client: Client, message: Message):
         await handle_sample(client, message, user, file_name, file_obj)
     elif video_tool == "mediainfo":
         await handle_mediainfo(client, message, user, file_name, file_obj)
+    elif video_tool == "screenshots":
+        await handle_screenshots(client, message, user, file_name, file_obj)
+
+@Client.on_message(filters.text & filters.regex(r"^https?://\S+$"))
+async def handle_url(client: Client, message: Message):
+    """Download a direct link for users in URL download mode and send it back as a Telegram file"""
+    user_id = message.from_user.id
+    current_task_id.set(None)
+    current_timeline.set(None)
+
+    user = await db.get_user(user_id)
+    if not user or user.get("settings", Config.DEFAULT_SETTINGS).get("download_mode") != "url":
+        return
+
+    user = await get_active_user(message)
+    if not user:
+        return
+
+    settings = user.get("settings", Config.DEFAULT_SETTINGS)
+    url = message.text.strip()
+    file_name = os.path.basename(unquote(urlparse(url).path)) or f"url_{user_id}"
+
+    status_msg = status_editor.wrap(await message.reply_text("⏬ **Downloading from URL...**"))
+    workspace = None
+
+    try:
+        task_id = await db.add_task(user_id, "url_download")
+        current_task_id.set(task_id)
+        start_timeline(task_id)
+
+        # The size is only known once the download starts, so it is capped instead of reserved
+        workspace = workspace_manager.create(f"url_{user_id}")
+        file_path = await DownloadHelper.download_from_url(
+            url, workspace.file(file_name), status_msg, max_size=Config.MAX_FILE_SIZE
+        )
+        if not file_path:
+            raise Exception("Download failed")
+
+        await status_msg.edit_text("⏬ **Downloading from URL...**\\n\\nUploading...")
+
+        as_document = settings.get("send_as") == "document" or not is_video_file(file_name)
+        await UploadHelper.upload_to_telegram(
+            client, message.chat.id, file_path,
+            caption=f"✅ {file_name}", as_document=as_document, status_msg=status_msg
+        )
+
+        await status_msg.edit_text("✅ **Download Complete!**")
+        await db.complete_task(task_id)
+
+    except Exception as e:
+        await status_msg.edit_text(f"❌ **Error:** {str(e)}")
+    finally:
+        with span("cleanup"):
+            workspace_manager.release(workspace)
+        await save_task_timeline()
 
 async def handle_merge(client, message, user, file_name, file_obj):
     """Handle video merge"""
@@ -150,27 +255,53 @@ async def process_merge(client, message, user, temp_files, merge_type):
     user_id = user["user_id"]
     settings = user.get("settings", Config.DEFAULT_SETTINGS)
 
-    status_msg = await message.reply_text("⏳ **Processing...**\\n\\nDownloading files...")
+    status_msg = status_editor.wrap(await message.reply_text("⏳ **Processing...**\\n\\nDownloading files..."))
+    results = []
+    workspace = None
 
     try:
         task_id = await db.add_task(user_id, f"merge_{merge_type}")
+        current_task_id.set(task_id)
+        start_timeline(task_id)
 
-        download_dir = os.path.join(Config.DOWNLOAD_DIR, str(user_id))
-        os.makedirs(download_dir, exist_ok=True)
+        messages = await client.get_messages(message.chat.id, [f["message_id"] for f in temp_files])
 
-        downloaded_files = []
-        for idx, file_info in enumerate(temp_files):
-            file_path = os.path.join(download_dir, f"{idx}_{file_info['file_name']}")
-            
-            msg = await client.get_messages(message.chat.id, file_info['message_id'])
-            result = await DownloadHelper.download_telegram_file(client, msg, file_path, status_msg)
-            
-            if result:
-                downloaded_files.append({"path": file_path, "type": file_info["file_type"]})
+        as_document = settings.get("send_as") == "document"
+        caption = f"✅ Merged: {merge_type.replace('_', ' + ').title()}"
+        inputs = [f"{file_info['file_type']}:{get_media(msg).file_unique_id}" for file_info, msg in zip(temp_files, messages)]
+        # Only concatenation depends on the order the files were sent in
+        cache_key = result_cache_key(
+            f"merge_{merge_type}", inputs if merge_type == "video_video" else sorted(inputs), as_document=as_document
+        )
+
+        if settings.get("upload_mode") == "telegram" and await UploadHelper.send_cached_result(
+            client, message.chat.id, cache_key, caption
+        ):
+            await status_msg.edit_text("✅ **Merge Complete!**")
+            await db.clear_temp_files(user_id)
+            await db.complete_task(task_id)
+            return
+
+        # Output plus normalized intermediates can each reach the combined input size
+        input_size = sum(get_media(msg).file_size or 0 for msg in messages)
+        workspace = workspace_manager.create(
+            f"merge_{user_id}", input_cache.pending_size(*messages), input_size * 2
+        )
+
+        results = await input_cache.acquire_many(
+            client, [(msg, file_info["file_name"]) for file_info, msg in zip(temp_files, messages)], status_msg,
+            volume=workspace.input_volume
+        )
+        workspace_manager.inputs_ready(workspace)
+
+        downloaded_files = [
+            {"path": result, "type": file_info["file_type"]}
+            for file_info, result in zip(temp_files, results) if result
+        ]
 
         await status_msg.edit_text("⏳ **Processing...**\\n\\nMerging files...")
 
-        output_file = os.path.join(download_dir, f"merged_{user_id}.mp4")
+        output_file = workspace.file(f"merged_{user_id}.mp4")
 
         if merge_type == "video_video":
             videos = [f["path"] for f in downloaded_files if f["type"] == "video"]
@@ -191,13 +322,11 @@ async def process_merge(client, message, user, temp_files, merge_type):
 
         await status_msg.edit_text("⏳ **Processing...**\\n\\nUploading result...")
 
-        as_document = settings.get("send_as") == "document"
-        caption = f"✅ Merged: {merge_type.replace('_', ' + ').title()}"
-
         if settings.get("upload_mode") == "telegram":
             await UploadHelper.upload_to_telegram(
                 client, message.chat.id, output_file,
-                caption=caption, as_document=as_document, status_msg=status_msg
+                caption=caption, as_document=as_document, status_msg=status_msg,
+                cache_key=cache_key
             )
             await status_msg.edit_text("✅ **Merge Complete!**")
         else:
@@ -210,15 +339,14 @@ async def process_merge(client, message, user, temp_files, merge_type):
         await db.clear_temp_files(user_id)
         await db.complete_task(task_id)
 
-        for file in downloaded_files:
-            if os.path.exists(file["path"]):
-                os.remove(file["path"])
-        if os.path.exists(output_file):
-            os.remove(output_file)
-
     except Exception as e:
         await status_msg.edit_text(f"❌ **Error:** {str(e)}")
         await db.clear_temp_files(user_id)
+    finally:
+        with span("cleanup"):
+            input_cache.release(*results)
+            workspace_manager.release(workspace)
+        await save_task_timeline()
 
 async def handle_encoding(client, message, user, file_name, file_obj):
     """Handle video encoding"""
@@ -234,21 +362,72 @@ async def handle_encoding(client, message, user, file_name, file_obj):
         await message.reply_text("⚠️ पहले encoding quality preset select करें!")
         return
 
-    status_msg = await message.reply_text("⏳ **Encoding Video...**\\n\\nDownloading...")
+    # Multi quality selected but every quality toggled off again
+    if "ladder" in encoding_settings and not encoding_settings["ladder"]:
+        await message.reply_text("⚠️ Multi Quality के लिए कम से कम एक quality select करें!")
+        return
+
+    status_msg = status_editor.wrap(await message.reply_text("⏳ **Encoding Video...**\\n\\nDownloading..."))
+    input_file = None
+    workspace = None
 
     try:
         task_id = await db.add_task(user_id, "encoding")
+        current_task_id.set(task_id)
+        start_timeline(task_id)
 
-        download_dir = os.path.join(Config.DOWNLOAD_DIR, str(user_id))
-        os.makedirs(download_dir, exist_ok=True)
-        input_file = os.path.join(download_dir, file_name)
-        output_file = os.path.join(download_dir, f"encoded_{file_name}")
+        # Multi quality jobs map each rendition's output file to its preset name
+        ladder = encoding_settings.get("ladder")
+        if ladder:
+            outputs = {f"{quality}_{file_name}": quality for quality in ladder}
+        else:
+            outputs = {f"encoded_{file_name}": encoding_settings.get("preset_name", "custom")}
 
-        await DownloadHelper.download_telegram_file(client, message, input_file, status_msg)
+        as_document = settings.get("send_as") == "document"
+        cache_keys = {
+            name: result_cache_key(
+                "encoding", [file_obj.file_unique_id], Config.VIDEO_PRESETS[quality] if ladder else encoding_settings,
+                as_document=as_document
+            )
+            for name, quality in outputs.items()
+        }
+
+        # Renditions someone already produced from this file are re-sent by file_id
+        for name, quality in list(outputs.items()):
+            if await UploadHelper.send_cached_result(
+                client, message.chat.id, cache_keys[name], f"✅ Encoded: {quality.upper()}"
+            ):
+                del outputs[name]
+
+        if not outputs:
+            await status_msg.edit_text("✅ **Encoding Complete!**")
+            await db.complete_task(task_id)
+            await db.set_video_tool(user_id, None)
+            return
+
+        # Each rendition plus the split/encoded segments of a parallel encode
+        workspace = workspace_manager.create(
+            f"encoding_{user_id}", input_cache.pending_size(message), file_obj.file_size * len(outputs) * 2
+        )
+        outputs = {workspace.file(name): quality for name, quality in outputs.items()}
+        cache_keys = {workspace.file(name): key for name, key in cache_keys.items()}
+
+        input_file = await input_cache.acquire(client, message, file_name, status_msg, workspace.input_volume)
+        workspace_manager.inputs_ready(workspace)
+        if not input_file:
+            raise Exception("Download failed")
 
         await status_msg.edit_text("⏳ **Encoding Video...**\\n\\nEncoding...")
 
-        success = await FFmpegHelper.encode_video(input_file, output_file, encoding_settings, status_msg)
+        if ladder:
+            success = await FFmpegHelper.encode_ladder(
+                input_file,
+                {path: Config.VIDEO_PRESETS[quality] for path, quality in outputs.items()},
+                status_msg
+            )
+        else:
+            output_file = next(iter(outputs))
+            success = await FFmpegHelper.encode_video(input_file, output_file, encoding_settings, status_msg)
 
         if not success:
             await status_msg.edit_text("❌ **Encoding Failed**")
@@ -257,26 +436,26 @@ async def handle_encoding(client, message, user, file_name, file_obj):
 
         await status_msg.edit_text("⏳ **Encoding Video...**\\n\\nUploading...")
 
-        as_document = settings.get("send_as") == "document"
-        quality = encoding_settings.get("preset_name", "custom")
-        caption = f"✅ Encoded: {quality.upper()}"
+        for output_file, quality in outputs.items():
+            caption = f"✅ Encoded: {quality.upper()}"
 
-        await UploadHelper.upload_to_telegram(
-            client, message.chat.id, output_file,
-            caption=caption, as_document=as_document, status_msg=status_msg
-        )
+            await UploadHelper.upload_to_telegram(
+                client, message.chat.id, output_file,
+                caption=caption, as_document=as_document, status_msg=status_msg,
+                cache_key=cache_keys[output_file]
+            )
 
         await status_msg.edit_text("✅ **Encoding Complete!**")
         await db.complete_task(task_id)
         await db.set_video_tool(user_id, None)
 
-        if os.path.exists(input_file):
-            os.remove(input_file)
-        if os.path.exists(output_file):
-            os.remove(output_file)
-
     except Exception as e:
         await status_msg.edit_text(f"❌ **Error:** {str(e)}")
+    finally:
+        with span("cleanup"):
+            input_cache.release(input_file)
+            workspace_manager.release(workspace)
+        await save_task_timeline()
 
 async def handle_convert(client, message, user, file_name, file_obj):
     """Handle document/video conversion"""
@@ -285,14 +464,17 @@ async def handle_convert(client, message, user, file_name, file_obj):
     
     as_document = not (message.document is not None)
     
-    status_msg = await message.reply_text("🔄 **Converting...**")
+    status_msg = status_editor.wrap(await message.reply_text("🔄 **Converting...**"))
+    file_path = None
+    workspace = None
     
     try:
-        download_dir = os.path.join(Config.DOWNLOAD_DIR, str(user_id))
-        os.makedirs(download_dir, exist_ok=True)
-        file_path = os.path.join(download_dir, file_name)
-        
-        await DownloadHelper.download_telegram_file(client, message, file_path, status_msg)
+        # Nothing is written besides the input itself
+        workspace = workspace_manager.create(f"convert_{user_id}", input_cache.pending_size(message))
+        file_path = await input_cache.acquire(client, message, file_name, status_msg, workspace.input_volume)
+        workspace_manager.inputs_ready(workspace)
+        if not file_path:
+            raise Exception("Download failed")
         
         await status_msg.edit_text("🔄 **Converting...**\\n\\nUploading...")
         
@@ -304,12 +486,12 @@ async def handle_convert(client, message, user, file_name, file_obj):
         
         await status_msg.edit_text("✅ **Convert Complete!**")
         await db.set_video_tool(user_id, None)
-        
-        if os.path.exists(file_path):
-            os.remove(file_path)
             
     except Exception as e:
         await status_msg.edit_text(f"❌ **Error:** {str(e)}")
+    finally:
+        input_cache.release(file_path)
+        workspace_manager.release(workspace)
 
 async def handle_watermark(client, message, user, file_name, file_obj):
     """Handle watermark addition"""
@@ -341,22 +523,48 @@ async def process_watermark(client, message, user, temp_files):
     settings = user.get("settings", Config.DEFAULT_SETTINGS)
     position = user.get("watermark_position", "topright")
     
-    status_msg = await message.reply_text("⏳ **Adding Watermark...**\\n\\nDownloading...")
+    status_msg = status_editor.wrap(await message.reply_text("⏳ **Adding Watermark...**\\n\\nDownloading..."))
+    results = []
+    workspace = None
     
     try:
         task_id = await db.add_task(user_id, "watermark")
-        
-        download_dir = os.path.join(Config.DOWNLOAD_DIR, str(user_id))
-        os.makedirs(download_dir, exist_ok=True)
+        current_task_id.set(task_id)
+        start_timeline(task_id)
         
         video_file = None
         watermark_file = None
         
-        for file_info in temp_files:
-            file_path = os.path.join(download_dir, file_info['file_name'])
-            msg = await client.get_messages(message.chat.id, file_info['message_id'])
-            await DownloadHelper.download_telegram_file(client, msg, file_path, status_msg)
-            
+        messages = await client.get_messages(message.chat.id, [f["message_id"] for f in temp_files])
+
+        as_document = settings.get("send_as") == "document"
+        caption = f"✅ Watermark Added ({position})"
+        inputs = sorted(
+            f"{file_info['file_type']}:{get_media(msg).file_unique_id}" for file_info, msg in zip(temp_files, messages)
+        )
+        cache_key = result_cache_key("watermark", inputs, {"position": position}, as_document=as_document)
+
+        if await UploadHelper.send_cached_result(client, message.chat.id, cache_key, caption):
+            await status_msg.edit_text("✅ **Watermark Complete!**")
+            await db.clear_temp_files(user_id)
+            await db.complete_task(task_id)
+            return
+
+        video_size = sum(
+            get_media(msg).file_size or 0
+            for file_info, msg in zip(temp_files, messages) if file_info["file_type"] == "video"
+        )
+        workspace = workspace_manager.create(
+            f"watermark_{user_id}", input_cache.pending_size(*messages), video_size
+        )
+
+        results = await input_cache.acquire_many(
+            client, [(msg, file_info["file_name"]) for file_info, msg in zip(temp_files, messages)], status_msg,
+            volume=workspace.input_volume
+        )
+        workspace_manager.inputs_ready(workspace)
+
+        for file_info, file_path in zip(temp_files, results):
             if file_info["file_type"] == "video":
                 video_file = file_path
             else:
@@ -364,7 +572,7 @@ async def process_watermark(client, message, user, temp_files):
         
         await status_msg.edit_text("⏳ **Adding Watermark...**\\n\\nProcessing...")
         
-        output_file = os.path.join(download_dir, f"watermarked_{user_id}.mp4")
+        output_file = workspace.file(f"watermarked_{user_id}.mp4")
         success = await FFmpegHelper.add_watermark(video_file, watermark_file, output_file, position, status_msg)
         
         if not success:
@@ -374,25 +582,24 @@ async def process_watermark(client, message, user, temp_files):
         
         await status_msg.edit_text("⏳ **Adding Watermark...**\\n\\nUploading...")
         
-        as_document = settings.get("send_as") == "document"
-        caption = f"✅ Watermark Added ({position})"
-        
         await UploadHelper.upload_to_telegram(
             client, message.chat.id, output_file,
-            caption=caption, as_document=as_document, status_msg=status_msg
+            caption=caption, as_document=as_document, status_msg=status_msg,
+            cache_key=cache_key
         )
         
         await status_msg.edit_text("✅ **Watermark Complete!**")
         await db.clear_temp_files(user_id)
         await db.complete_task(task_id)
-        
-        for path in [video_file, watermark_file, output_file]:
-            if path and os.path.exists(path):
-                os.remove(path)
                 
     except Exception as e:
         await status_msg.edit_text(f"❌ **Error:** {str(e)}")
         await db.clear_temp_files(user_id)
+    finally:
+        with span("cleanup"):
+            input_cache.release(*results)
+            workspace_manager.release(workspace)
+        await save_task_timeline()
 
 async def handle_trim(client, message, user, file_name, file_obj):
     """Handle video trimming"""
@@ -413,26 +620,54 @@ async def handle_sample(client, message, user, file_name, file_obj):
         await message.reply_text("⚠️ Video file भेजें!")
         return
 
-    status_msg = await message.reply_text("🎬 **Generating Sample...**")
+    status_msg = status_editor.wrap(await message.reply_text("🎬 **Generating Sample...**"))
+    input_file = None
+    workspace = None
 
     try:
         task_id = await db.add_task(user_id, "sample")
+        current_task_id.set(task_id)
+        start_timeline(task_id)
+
+        caption = "✅ 30-second sample generated"
+        cache_key = result_cache_key("sample", [file_obj.file_unique_id], {"duration": 30})
+
+        if await UploadHelper.send_cached_result(client, message.chat.id, cache_key, caption):
+            await status_msg.edit_text("✅ **Sample Generated!**")
+            await db.complete_task(task_id)
+            await db.set_video_tool(user_id, None)
+            return
 
-        download_dir = os.path.join(Config.DOWNLOAD_DIR, str(user_id))
-        os.makedirs(download_dir, exist_ok=True)
-        input_file = os.path.join(download_dir, file_name)
-        output_file = os.path.join(download_dir, f"sample_{file_name}")
+        # Streaming needs no input on disk, but a fallback download may
+        workspace = workspace_manager.create(f"sample_{user_id}", input_cache.pending_size(message))
+        output_file = workspace.file(f"sample_{file_name}")
+        success = False
 
-        await DownloadHelper.download_telegram_file(client, message, input_file, status_msg)
-        await status_msg.edit_text("🎬 **Generating Sample...**\\n\\nProcessing...")
+        # Cut the sample while the file streams in; containers that need seeking fall back to a full download
+        if Config.STREAM_PROCESSING and not input_cache.contains(file_obj.file_unique_id):
+            descriptor = await FFmpegHelper.probe_stream(
+                DownloadHelper.stream_telegram_file(client, message, limit=Config.STREAM_PROBE_CHUNKS)
+            )
+            if descriptor and descriptor.duration:
+                success = await FFmpegHelper.generate_sample_from_stream(
+                    DownloadHelper.stream_telegram_file(client, message, status_msg=status_msg),
+                    descriptor.duration, output_file, duration=30
+                )
+
+        if not success:
+            input_file = await input_cache.acquire(client, message, file_name, status_msg, workspace.input_volume)
+            workspace_manager.inputs_ready(workspace)
+            if not input_file:
+                raise Exception("Download failed")
+            await status_msg.edit_text("🎬 **Generating Sample...**\\n\\nProcessing...")
 
-        success = await FFmpegHelper.generate_sample(input_file, output_file, duration=30, status_msg=status_msg)
+            success = await FFmpegHelper.generate_sample(input_file, output_file, duration=30, status_msg=status_msg)
 
         if success:
-            await client.send_video(
-                message.chat.id,
-                output_file,
-                caption="✅ 30-second sample generated"
+            await UploadHelper.upload_to_telegram(
+                client, message.chat.id, output_file,
+                caption=caption, as_document=False, status_msg=status_msg,
+                cache_key=cache_key
             )
             await status_msg.edit_text("✅ **Sample Generated!**")
         else:
@@ -441,12 +676,13 @@ async def handle_sample(client, message, user, file_name, file_obj):
         await db.complete_task(task_id)
         await db.set_video_tool(user_id, None)
 
-        for path in [input_file, output_file]:
-            if os.path.exists(path):
-                os.remove(path)
-
     except Exception as e:
         await status_msg.edit_text(f"❌ **Error:** {str(e)}")
+    finally:
+        with span("cleanup"):
+            input_cache.release(input_file)
+            workspace_manager.release(workspace)
+        await save_task_timeline()
 
 async def handle_mediainfo(client, message, user, file_name, file_obj):
     """Handle mediainfo extraction"""
@@ -456,23 +692,98 @@ async def handle_mediainfo(client, message, user, file_name, file_obj):
         await message.reply_text("⚠️ Video file भेजें!")
         return
 
-    status_msg = await message.reply_text("📊 **Extracting MediaInfo...**")
+    status_msg = status_editor.wrap(await message.reply_text("📊 **Extracting MediaInfo...**"))
+    input_file = None
+    workspace = None
 
     try:
-        download_dir = os.path.join(Config.DOWNLOAD_DIR, str(user_id))
-        os.makedirs(download_dir, exist_ok=True)
-        input_file = os.path.join(download_dir, file_name)
-
-        await DownloadHelper.download_telegram_file(client, message, input_file, status_msg)
+        media_info = None
 
-        media_info = await FFmpegHelper.get_mediainfo_text(input_file)
+        # Probe a sparse copy holding only the header (and a trailing moov); the data in between is never fetched
+        if Config.STREAM_PROCESSING and not input_cache.contains(file_obj.file_unique_id):
+            workspace = workspace_manager.create(
+                f"mediainfo_{user_id}",
+                output_size=DownloadHelper.head_size(Config.STREAM_PROBE_CHUNKS, file_obj.file_size)
+            )
+            probe_file = await DownloadHelper.download_telegram_head(
+                client, message, workspace.file(file_name), Config.STREAM_PROBE_CHUNKS
+            )
+            descriptor = await FFmpegHelper.probe(probe_file, read_packets=False) if probe_file else None
+            if descriptor:
+                media_info = FFmpegHelper.format_mediainfo(descriptor.raw, file_name, file_obj.file_size)
+
+        if not media_info:
+            # The partial copy is no longer needed; only a full download reserves the whole file
+            workspace_manager.release(workspace)
+            workspace = workspace_manager.create(f"mediainfo_{user_id}", input_cache.pending_size(message))
+            input_file = await input_cache.acquire(client, message, file_name, status_msg, workspace.input_volume)
+            workspace_manager.inputs_ready(workspace)
+            if not input_file:
+                raise Exception("Download failed")
+            media_info = await FFmpegHelper.get_mediainfo_text(input_file, file_obj.file_unique_id)
 
         await status_msg.edit_text(media_info)
         await db.set_video_tool(user_id, None)
 
-        if os.path.exists(input_file):
-            os.remove(input_file)
+    except Exception as e:
+        await status_msg.edit_text(f"❌ **Error:** {str(e)}")
+    finally:
+        input_cache.release(input_file)
+        workspace_manager.release(workspace)
+
+async def handle_screenshots(client, message, user, file_name, file_obj):
+    """Handle screenshot and contact sheet extraction"""
+    user_id = user["user_id"]
+    screenshot_settings = user.get("screenshot_settings") or {"mode": "interval", "tile": False}
+
+    if not is_video_file(file_name):
+        await message.reply_text("⚠️ Video file भेजें!")
+        return
+
+    status_msg = status_editor.wrap(await message.reply_text("📸 **Extracting Screenshots...**"))
+    input_file = None
+    workspace = None
+
+    try:
+        task_id = await db.add_task(user_id, "screenshots")
+        current_task_id.set(task_id)
+        start_timeline(task_id)
+
+        workspace = workspace_manager.create(f"screenshots_{user_id}", input_cache.pending_size(message))
+        output_dir = workspace.file("screenshots")
+
+        input_file = await input_cache.acquire(client, message, file_name, status_msg, workspace.input_volume)
+        workspace_manager.inputs_ready(workspace)
+        if not input_file:
+            raise Exception("Download failed")
+        await status_msg.edit_text("📸 **Extracting Screenshots...**\\n\\nProcessing...")
+
+        shots = await FFmpegHelper.generate_screenshots(
+            input_file, output_dir, Config.SCREENSHOT_COUNT,
+            mode=screenshot_settings.get("mode", "interval"),
+            tile=screenshot_settings.get("tile", False),
+            status_msg=status_msg
+        )
+
+        if len(shots) == 1:
+            with span("upload", endpoint="telegram", bytes=os.path.getsize(shots[0])):
+                await client.send_photo(message.chat.id, shots[0], caption="✅ Contact sheet generated")
+            await status_msg.edit_text("✅ **Screenshots Generated!**")
+        elif shots:
+            with span("upload", endpoint="telegram", bytes=sum(os.path.getsize(path) for path in shots)):
+                for i in range(0, len(shots), 10):
+                    await client.send_media_group(message.chat.id, [InputMediaPhoto(path) for path in shots[i:i + 10]])
+            await status_msg.edit_text("✅ **Screenshots Generated!**")
+        else:
+            await status_msg.edit_text("❌ **Screenshot Extraction Failed**")
+
+        await db.complete_task(task_id)
+        await db.set_video_tool(user_id, None)
 
     except Exception as e:
         await status_msg.edit_text(f"❌ **Error:** {str(e)}")
-  
+    finally:
+        with span("cleanup"):
+            input_cache.release(input_file)
+            workspace_manager.release(workspace)
+        await save_task_timeline()
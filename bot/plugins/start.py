@@ -2,6 +2,7 @@ from pyrogram import Client, filters
 from pyrogram.types import Message
 from bot.database import db
 from bot.helpers.buttons import main_menu_buttons
+from bot.helpers.scheduler import ffmpeg_scheduler
 from bot.utils.helpers import is_admin, is_authorized_group
 from config import Config
 
@@ -18,6 +19,7 @@ WELCOME_TEXT = """
 • Video Trimming
 • Sample Generation
 • MediaInfo Extraction
+• Screenshots & Contact Sheets
 
 ⚙️ **शुरू करने के लिए:**
 1. पहले **User Settings** configure करें
@@ -142,6 +144,9 @@ async def show_tasks(client: Client, message: Message):
         except:
             continue
 
+    queue = ffmpeg_scheduler.get_status()
+    text += f"⚙️ **FFmpeg:** {queue['running']}/{queue['max_jobs']} running, {queue['queued']} queued"
+
     await message.reply_text(text)
 
 @Client.on_message(filters.command("help"))
@@ -168,7 +173,7 @@ Processing से पहले अपनी preferences configure करें:
 • **Upload Mode**: Telegram या GoFile server
 
 **2️⃣ Video Tools**
-7 शक्तिशाली tools में से चुनें:
+8 शक्तिशाली tools में से चुनें:
 
 🔗 **Video Merge**
    • Video + Video: Multiple videos merge करें
@@ -196,6 +201,9 @@ Processing से पहले अपनी preferences configure करें:
 📊 **MediaInfo**
    • Detailed video information पाएं
 
+📸 **Screenshots**
+   • Screenshots, scene changes या contact sheet पाएं
+
 **Important Notes:**
 • एक समय में एक task per user
 • Authorized groups में ही काम करता है
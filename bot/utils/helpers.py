@@ -1,3 +1,5 @@
+import hashlib
+import json
 from config import Config
 from bot.database import db
 
@@ -32,6 +34,10 @@ def is_subtitle_file(filename: str) -> bool:
     subtitle_extensions = ['srt', 'ass', 'ssa', 'vtt', 'sub']
     return get_file_extension(filename).lower() in subtitle_extensions
 
+def get_media(message):
+    """Get the media object of a message"""
+    return message.video or message.document or message.audio or message.photo
+
 def format_size(bytes: int) -> str:
     """Format bytes to human readable size"""
     for unit in ['B', 'KB', 'MB', 'GB']:
@@ -56,4 +62,13 @@ def get_progress_bar(percentage: float, length: int = 10) -> str:
     filled = int(length * percentage / 100)
     bar = "█" * filled + "░" * (length - filled)
     return f"[{bar}] {percentage:.1f}%"
-    
+
+def result_cache_key(operation: str, inputs: list, settings: dict = None, as_document: bool = False) -> str:
+    """Stable key for an operation's output: input file_unique_ids + normalized settings + send type"""
+    # Labels and scheduling hints do not change the output
+    settings = {k: v for k, v in (settings or {}).items() if k not in ("preset_name", "parallel")}
+    # A cached document must not be re-sent to a user who wants videos, and vice versa
+    payload = json.dumps(
+        {"operation": operation, "inputs": inputs, "settings": settings, "as_document": as_document}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
@@ -48,14 +48,62 @@ class Config:
     DATABASE_NAME = os.environ.get("DATABASE_NAME", "video_tools_bot")
 
     # Download/Upload Configuration
-    DOWNLOAD_DIR = os.environ.get("DOWNLOAD_DIR", "downloads")
+    # Comma separated scratch volumes; tasks are spread across them by free space and I/O load
+    DOWNLOAD_DIRS = [d.strip() for d in os.environ.get("DOWNLOAD_DIR", "downloads").split(",") if d.strip()]
+    DOWNLOAD_DIR = DOWNLOAD_DIRS[0]
+    # Put a task's downloaded input and its outputs on different devices when possible
+    SPLIT_IO_VOLUMES = os.environ.get("SPLIT_IO_VOLUMES", "true").lower() == "true"
     MAX_FILE_SIZE = int(os.environ.get("MAX_FILE_SIZE", "2147483648"))
+    # Parallel downloads per multi-file job (merge/watermark)
+    DOWNLOAD_CONCURRENCY = int(os.environ.get("DOWNLOAD_CONCURRENCY", "3"))
+    # Feed Telegram chunks straight into ffprobe/ffmpeg for mediainfo and samples
+    STREAM_PROCESSING = os.environ.get("STREAM_PROCESSING", "true").lower() == "true"
+    # Max 1 MB chunks a streamed header probe may read
+    STREAM_PROBE_CHUNKS = int(os.environ.get("STREAM_PROBE_CHUNKS", "16"))
+
+    # Parallel ranged URL downloads
+    URL_SEGMENTS = int(os.environ.get("URL_SEGMENTS", "4"))
+    URL_SEGMENT_MIN_SIZE = int(os.environ.get("URL_SEGMENT_MIN_SIZE", "8388608"))
+    URL_SEGMENT_RETRIES = int(os.environ.get("URL_SEGMENT_RETRIES", "5"))
+
+    # Shared HTTP client pool
+    HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "100"))
+    HTTP_POOL_PER_HOST = int(os.environ.get("HTTP_POOL_PER_HOST", "10"))
+    HTTP_DNS_TTL = int(os.environ.get("HTTP_DNS_TTL", "300"))
+    HTTP_KEEPALIVE = int(os.environ.get("HTTP_KEEPALIVE", "60"))
+    HTTP_CHUNK_SIZE = int(os.environ.get("HTTP_CHUNK_SIZE", "1048576"))
 
     # GoFile Configuration
     GOFILE_API_KEY = os.environ.get("GOFILE_API_KEY", "")
 
     # FFmpeg Configuration
     FFMPEG_THREADS = int(os.environ.get("FFMPEG_THREADS", "2"))
+    # 0 = auto (CPU count / FFMPEG_THREADS)
+    FFMPEG_MAX_JOBS = int(os.environ.get("FFMPEG_MAX_JOBS", "0"))
+    # 0 = auto (1.5x CPU count)
+    FFMPEG_MAX_LOAD = float(os.environ.get("FFMPEG_MAX_LOAD", "0"))
+    PROBE_CACHE_SIZE = int(os.environ.get("PROBE_CACHE_SIZE", "256"))
+    KEYFRAME_INDEX_DIR = os.environ.get("KEYFRAME_INDEX_DIR", os.path.join(DOWNLOAD_DIR, ".keyframes"))
+    KEYFRAME_INDEX_FILES = int(os.environ.get("KEYFRAME_INDEX_FILES", "2048"))
+    # Downloaded inputs shared across tasks by file_unique_id (disk budget in bytes)
+    INPUT_CACHE_SIZE = int(os.environ.get("INPUT_CACHE_SIZE", "10737418240"))
+    # Free space kept in reserve on every scratch volume (bytes)
+    DISK_RESERVE = int(os.environ.get("DISK_RESERVE", "1073741824"))
+    # Status message edits: min seconds between edits in one chat, max edits per second overall
+    STATUS_EDIT_INTERVAL = float(os.environ.get("STATUS_EDIT_INTERVAL", "3"))
+    STATUS_EDIT_RATE = int(os.environ.get("STATUS_EDIT_RATE", "20"))
+    # Re-send earlier outputs by Telegram file_id for repeated (input, operation, settings)
+    RESULT_CACHE = os.environ.get("RESULT_CACHE", "true").lower() == "true"
+    # Local Prometheus endpoint; METRICS_PORT=0 disables it
+    METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.environ.get("METRICS_PORT", "9400"))
+
+    # Segment-parallel encoding (presets with "parallel": True)
+    # 0 = auto (one segment per scheduler slot)
+    PARALLEL_SEGMENTS = int(os.environ.get("PARALLEL_SEGMENTS", "0"))
+    PARALLEL_MIN_DURATION = int(os.environ.get("PARALLEL_MIN_DURATION", "300"))
+
+    SCREENSHOT_COUNT = int(os.environ.get("SCREENSHOT_COUNT", "9"))
 
     # Bot Settings
     SESSION_NAME = os.environ.get("SESSION_NAME", "video_tools_bot")
@@ -79,7 +127,8 @@ class Config:
             "bitrate": "5000k",
             "audio_bitrate": "192k",
             "preset": "medium",
-            "codec": "libx264"
+            "codec": "libx264",
+            "parallel": True
         },
         "1080p_hevc": {
             "resolution": "1920x1080",
@@ -87,7 +136,8 @@ class Config:
             "bitrate": "3500k",
             "audio_bitrate": "192k",
             "preset": "medium",
-            "codec": "libx265"
+            "codec": "libx265",
+            "parallel": True
         },
         "720p": {
             "resolution": "1280x720",
@@ -103,7 +153,8 @@ class Config:
             "bitrate": "2000k",
             "audio_bitrate": "128k",
             "preset": "medium",
-            "codec": "libx265"
+            "codec": "libx265",
+            "parallel": True
         },
         "480p": {
             "resolution": "854x480",
@@ -0,0 +1,667 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the file handling pipeline
+
+Drives the real plugin entry point (bot.plugins.file_handler.handle_file)
+with a fake pyrogram Client that serves media from local files over
+simulated download/upload links, so capacity can be measured without
+Telegram. The database is either an in-memory stand-in behind the real
+Database methods or a local mongod (--mongo-uri).
+
+N users spread across G authorized groups each run a number of jobs picked
+from a weighted tool mix. The report covers throughput, p50/p95/p99 job
+latency, per-stage saturation from the task timelines and the load on the
+ffmpeg scheduler and status edit queue.
+
+Usage:
+    python load_test.py --users 20 --groups 4 --jobs 3
+    python load_test.py --mix encoding=1,sample=1 --download-speed 10 --upload-speed 5
+    python load_test.py --mongo-uri mongodb://localhost:27017 --output load.json
+"""
+
+import argparse
+import asyncio
+import copy
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MB = 1024 * 1024
+
+# tool -> kinds of media sent, in order
+SCENARIOS = {
+    "encoding": ["video"],
+    "sample": ["video"],
+    "mediainfo": ["video"],
+    "screenshots": ["video"],
+    "convert": ["video"],
+    "merge": ["video", "video"],
+    "watermark": ["video", "photo"],
+}
+DEFAULT_MIX = "encoding=3,sample=2,mediainfo=2,screenshots=1,merge=1,watermark=1"
+
+class MemoryCursor:
+    """Result of MemoryCollection.find"""
+
+    def __init__(self, docs: list, latency: float):
+        self._docs = docs
+        self._latency = latency
+
+    def sort(self, key: str, direction: int = 1):
+        self._docs.sort(key=lambda doc: MemoryCollection.get(doc, key) or 0, reverse=direction < 0)
+        return self
+
+    def limit(self, count: int):
+        self._docs = self._docs[:count] if count else self._docs
+        return self
+
+    async def to_list(self, length=None):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        return self._docs if length is None else self._docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in await self.to_list():
+            yield doc
+
+class MemoryCollection:
+    """Enough of a motor collection for bot.database.Database, kept in memory"""
+
+    def __init__(self, latency: float = 0.0):
+        self.docs = []
+        self.latency = latency
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    @staticmethod
+    def get(doc, key: str):
+        for part in key.split("."):
+            doc = doc.get(part) if isinstance(doc, dict) else None
+        return doc
+
+    def _matches(self, doc: dict, query: dict) -> bool:
+        for key, condition in (query or {}).items():
+            value = self.get(doc, key)
+            if isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+                for op, arg in condition.items():
+                    if op == "$gte":
+                        if value is None or value < arg:
+                            return False
+                    elif op == "$exists":
+                        if (value is not None) != bool(arg):
+                            return False
+                    else:
+                        raise NotImplementedError(f"Query operator {op}")
+            elif value != condition:
+                return False
+        return True
+
+    @staticmethod
+    def _apply(doc: dict, update: dict):
+        for op, fields in update.items():
+            for key, value in fields.items():
+                if op == "$set":
+                    doc[key] = copy.deepcopy(value)
+                elif op == "$push":
+                    doc.setdefault(key, []).append(copy.deepcopy(value))
+                else:
+                    raise NotImplementedError(f"Update operator {op}")
+
+    async def find_one(self, query: dict):
+        await self._delay()
+        for doc in self.docs:
+            if self._matches(doc, query):
+                return copy.deepcopy(doc)
+        return None
+
+    async def insert_one(self, doc: dict):
+        from bson import ObjectId
+
+        await self._delay()
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        await self._delay()
+        for doc in self.docs:
+            if self._matches(doc, query):
+                self._apply(doc, update)
+                return
+        if upsert:
+            doc = {key: value for key, value in query.items() if not isinstance(value, dict)}
+            self._apply(doc, update)
+            await self.insert_one(doc)
+
+    async def update_many(self, query: dict, update: dict):
+        await self._delay()
+        for doc in self.docs:
+            if self._matches(doc, query):
+                self._apply(doc, update)
+
+    async def delete_one(self, query: dict):
+        await self._delay()
+        for i, doc in enumerate(self.docs):
+            if self._matches(doc, query):
+                del self.docs[i]
+                return
+
+    async def count_documents(self, query: dict):
+        await self._delay()
+        return sum(1 for doc in self.docs if self._matches(doc, query))
+
+    def find(self, query: dict = None):
+        return MemoryCursor([copy.deepcopy(doc) for doc in self.docs if self._matches(doc, query)], self.latency)
+
+class Link:
+    """Simulated network link capped per transfer and in aggregate (bytes/s, 0 = unlimited)"""
+
+    def __init__(self, per_transfer: float, aggregate: float = 0):
+        self.per_transfer = per_transfer
+        self.aggregate = aggregate
+        self._free_at = 0.0
+        self.bytes = 0
+
+    async def transfer(self, nbytes: int):
+        self.bytes += nbytes
+        now = asyncio.get_running_loop().time()
+        finish = now + nbytes / self.per_transfer if self.per_transfer else now
+        if self.aggregate:
+            # Transfers queue behind each other on the shared link
+            self._free_at = max(now, self._free_at) + nbytes / self.aggregate
+            finish = max(finish, self._free_at)
+        if finish > now:
+            await asyncio.sleep(finish - now)
+
+class FakeMessage:
+    """The parts of pyrogram.types.Message the plugins use"""
+
+    def __init__(self, client, chat, message_id: int, from_user=None, text: str = None, **media):
+        self._client = client
+        self.chat = chat
+        self.id = message_id
+        self.from_user = from_user
+        self.text = text
+        self.video = media.get("video")
+        self.document = media.get("document")
+        self.audio = media.get("audio")
+        self.photo = media.get("photo")
+        self.date = datetime.utcnow()
+        self.replies = []
+        self.edits = 0
+
+    async def reply_text(self, text: str, **kwargs):
+        reply = await self._client.send_message(self.chat.id, text)
+        self.replies.append(reply)
+        return reply
+
+    async def edit_text(self, text: str, **kwargs):
+        await self._client.api_call("edit_message_text")
+        self.text = text
+        self.edits += 1
+        return self
+
+class FakeClient:
+    """Stands in for pyrogram.Client, serving media from local files over simulated links"""
+
+    # pyrogram streams media in fixed 1 MB chunks
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, download: Link, upload: Link, api_latency: float):
+        self.download_link = download
+        self.upload_link = upload
+        self.api_latency = api_latency
+        self.files = {}
+        self.messages = {}
+        self.calls = Counter()
+        self._ids = itertools.count(1)
+
+    def register(self, path: str, kind: str, unique_id: str = None):
+        """Media object for a local file; a fresh file_unique_id unless one is given"""
+        number = next(self._ids)
+        file_id = f"file_{number}"
+        self.files[file_id] = path
+        return SimpleNamespace(
+            file_id=file_id,
+            file_unique_id=unique_id or f"unique_{number}",
+            file_size=os.path.getsize(path),
+            file_name=os.path.basename(path) if kind != "photo" else None,
+            mime_type={"video": "video/mp4", "photo": "image/jpeg"}.get(kind, "application/octet-stream"),
+            width=0,
+            height=0,
+            duration=0
+        )
+
+    def new_message(self, chat, from_user=None, text: str = None, **media) -> FakeMessage:
+        message = FakeMessage(self, chat, next(self._ids), from_user, text, **media)
+        self.messages[(chat.id, message.id)] = message
+        return message
+
+    async def api_call(self, name: str):
+        self.calls[name] += 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+
+    async def _read(self, path: str, offset: int = 0, limit: int = 0):
+        with open(path, "rb") as f:
+            f.seek(offset * self.CHUNK_SIZE)
+            count = 0
+            while not limit or count < limit:
+                chunk = f.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                await self.download_link.transfer(len(chunk))
+                yield chunk
+                count += 1
+
+    async def _upload(self, path: str, progress=None):
+        total = os.path.getsize(path)
+        sent = 0
+        while sent < total:
+            size = min(self.CHUNK_SIZE, total - sent)
+            await self.upload_link.transfer(size)
+            sent += size
+            if progress:
+                await progress(sent, total)
+
+    @staticmethod
+    def _media(message):
+        return message.video or message.document or message.audio or message.photo
+
+    async def download_media(self, media, file_name: str, progress=None, **kwargs):
+        await self.api_call("download_media")
+        path = self.files[media.file_id]
+        total = os.path.getsize(path)
+        current = 0
+        with open(file_name, "wb") as out:
+            async for chunk in self._read(path):
+                out.write(chunk)
+                current += len(chunk)
+                if progress:
+                    await progress(current, total)
+        return file_name
+
+    async def stream_media(self, message, limit: int = 0, offset: int = 0):
+        self.calls["stream_media"] += 1
+        async for chunk in self._read(self.files[self._media(message).file_id], offset, limit):
+            yield chunk
+
+    async def get_messages(self, chat_id: int, message_ids):
+        await self.api_call("get_messages")
+        if isinstance(message_ids, (list, tuple)):
+            return [self.messages.get((chat_id, message_id)) for message_id in message_ids]
+        return self.messages.get((chat_id, message_ids))
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        await self.api_call("send_message")
+        return self.new_message(SimpleNamespace(id=chat_id, type="supergroup"), text=text)
+
+    async def _send_file(self, name: str, chat_id: int, path: str, kind: str, progress=None, caption: str = ""):
+        await self.api_call(name)
+        await self._upload(path, progress)
+        chat = SimpleNamespace(id=chat_id, type="supergroup")
+        return self.new_message(chat, text=caption, **{kind: self.register(path, kind)})
+
+    async def send_document(self, chat_id: int, document: str, thumb=None, caption: str = "", progress=None, **kwargs):
+        return await self._send_file("send_document", chat_id, document, "document", progress, caption)
+
+    async def send_video(self, chat_id: int, video: str, thumb=None, caption: str = "", progress=None, **kwargs):
+        return await self._send_file("send_video", chat_id, video, "video", progress, caption)
+
+    async def send_photo(self, chat_id: int, photo: str, caption: str = "", **kwargs):
+        return await self._send_file("send_photo", chat_id, photo, "photo", caption=caption)
+
+    async def send_media_group(self, chat_id: int, media: list, **kwargs):
+        await self.api_call("send_media_group")
+        for item in media:
+            await self._upload(item.media)
+        return []
+
+    async def send_cached_media(self, chat_id: int, file_id: str, caption: str = "", **kwargs):
+        await self.api_call("send_cached_media")
+        if file_id not in self.files:
+            raise ValueError("FILE_ID_INVALID")
+        return self.new_message(SimpleNamespace(id=chat_id, type="supergroup"), text=caption)
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown tool {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def latency_summary(values: list) -> dict:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+        "mean": statistics.mean(values) if values else 0.0
+    }
+
+async def stage_saturation(db, run_start: float, wall: float) -> dict:
+    """Average and peak concurrency of every timeline stage over the run"""
+    tasks = await db.tasks.find({"timeline": {"$exists": True}}).to_list(length=None)
+    intervals = defaultdict(list)
+    job_time = 0.0
+    for task in tasks:
+        base = task["started_at"].replace(tzinfo=timezone.utc).timestamp()
+        if base < run_start - 1:
+            continue
+        job_time += task["timeline"]["duration"]
+        for span in task["timeline"]["spans"]:
+            start = base + span["start"]
+            intervals[span["stage"]].append((start, start + span["duration"]))
+
+    stages = {}
+    for stage, spans in intervals.items():
+        busy = sum(end - start for start, end in spans)
+        events = sorted([(start, 1) for start, _ in spans] + [(end, -1) for _, end in spans])
+        current = peak = 0
+        for _, delta in events:
+            current += delta
+            peak = max(peak, current)
+        stages[stage] = {
+            "spans": len(spans),
+            "busy": busy,
+            "avg_concurrency": busy / wall if wall else 0.0,
+            "peak_concurrency": peak,
+            "share_of_job_time": busy / job_time if job_time else 0.0
+        }
+    return stages
+
+async def sample_pipeline(samples: list, interval: float):
+    """Periodically record scheduler, edit queue and workspace load"""
+    from bot.helpers.input_cache import input_cache
+    from bot.helpers.scheduler import ffmpeg_scheduler
+    from bot.helpers.status_editor import status_editor
+    from bot.helpers.workspace import workspace_manager
+
+    while True:
+        queue = ffmpeg_scheduler.get_status()
+        samples.append({
+            "ffmpeg_running": queue["running"],
+            "ffmpeg_queued": queue["queued"],
+            "status_edits_pending": status_editor.get_status()["pending"],
+            "workspaces": workspace_manager.get_status()["active"],
+            "inputs_in_use": input_cache.get_status()["in_use"]
+        })
+        await asyncio.sleep(interval)
+
+async def run(args) -> dict:
+    from config import Config
+    from bot.database import db
+    from bot.helpers.scheduler import ffmpeg_scheduler
+    from bot.helpers.status_editor import status_editor
+    from bot.plugins.file_handler import handle_file
+
+    if not args.mongo_uri:
+        # Real Database methods on top of in-memory collections
+        for name in ("users", "tasks", "groups", "results"):
+            setattr(db, name, MemoryCollection(args.db_latency))
+
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    client = FakeClient(
+        Link(args.download_speed * MB, args.link_download * MB),
+        Link(args.upload_speed * MB, args.link_upload * MB),
+        args.api_latency
+    )
+
+    videos = args.media or [args.video_paths[name] for name in ("360p_h264_10s", "720p_h264_30s")]
+    photo = args.video_paths["logo"]
+    shared_ids = {path: hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16] for path in videos + [photo]}
+
+    groups = [SimpleNamespace(id=group_id, type="supergroup") for group_id in args.group_ids]
+    users = []
+    for i in range(args.users):
+        user = SimpleNamespace(id=900000000 + i, username=f"load_user_{i}", mention=f"load_user_{i}")
+        group = groups[i % len(groups)]
+        await db.add_user(user.id, user.username)
+        await db.set_user_active(user.id, group.id, True)
+        users.append((user, group))
+
+    async def prepare(user_id: int, tool: str):
+        """What the callback buttons would have stored before the files are sent"""
+        await db.set_video_tool(user_id, tool)
+        if tool == "encoding":
+            await db.set_encoding_settings(user_id, {**Config.VIDEO_PRESETS[args.preset], "preset_name": args.preset})
+        elif tool == "merge":
+            await db.set_merge_type(user_id, "video_video")
+
+    jobs = []
+
+    async def run_user(user, group):
+        await asyncio.sleep(rng.uniform(0, args.ramp))
+        for _ in range(args.jobs):
+            tool = rng.choices(list(mix), weights=list(mix.values()))[0]
+            await prepare(user.id, tool)
+
+            started = time.perf_counter()
+            last = None
+            error = None
+            try:
+                for kind in SCENARIOS[tool]:
+                    path = photo if kind == "photo" else rng.choice(videos)
+                    media = client.register(path, kind, shared_ids[path] if args.shared_inputs else None)
+                    last = client.new_message(group, user, **{kind: media})
+                    await handle_file(client, last)
+            except Exception as e:
+                error = repr(e)
+            jobs.append({
+                "tool": tool,
+                "user": user.id,
+                "latency": time.perf_counter() - started,
+                "status": last,
+                "error": error
+            })
+            if args.think:
+                await asyncio.sleep(rng.expovariate(1 / args.think))
+
+    samples = []
+    sampler = asyncio.create_task(sample_pipeline(samples, args.sample_interval))
+    run_start = time.time()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_user(user, group) for user, group in users))
+        wall = time.perf_counter() - started
+
+        # Let queued status edits land so each job's final text is known
+        deadline = time.monotonic() + 120
+        while status_editor.get_status()["pending"] and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+        await asyncio.sleep(args.api_latency * 2)
+    finally:
+        sampler.cancel()
+
+    failed = Counter()
+    latencies = defaultdict(list)
+    for job in jobs:
+        replies = job.pop("status").replies
+        final = replies[-1].text if replies else ""
+        job["ok"] = not job["error"] and bool(final) and not final.startswith(("❌", "⚠️"))
+        if job["ok"]:
+            latencies[job["tool"]].append(job["latency"])
+        else:
+            failed[job["tool"]] += 1
+            job["final_text"] = final[:200]
+
+    completed = [latency for values in latencies.values() for latency in values]
+    pipeline = {}
+    for key in (samples[0] if samples else {}):
+        values = [sample[key] for sample in samples]
+        pipeline[key] = {"avg": statistics.mean(values), "max": max(values)}
+    if "ffmpeg_running" in pipeline:
+        pipeline["ffmpeg_running"]["utilization"] = pipeline["ffmpeg_running"]["avg"] / ffmpeg_scheduler.max_jobs
+
+    results = {
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "settings": {
+            key: value for key, value in vars(args).items() if key not in ("video_paths", "group_ids")
+        },
+        "environment": {
+            "cpu_count": os.cpu_count(),
+            "ffmpeg_max_jobs": ffmpeg_scheduler.max_jobs,
+            "threads_per_job": ffmpeg_scheduler.threads_per_job,
+            "database": "mongodb" if args.mongo_uri else "memory"
+        },
+        "wall": wall,
+        "jobs": {"total": len(jobs), "completed": len(completed), "failed": sum(failed.values())},
+        "failed_by_tool": dict(failed),
+        "throughput": {
+            "jobs_per_minute": len(completed) / wall * 60 if wall else 0.0,
+            "download_bytes_per_second": client.download_link.bytes / wall if wall else 0.0,
+            "upload_bytes_per_second": client.upload_link.bytes / wall if wall else 0.0
+        },
+        "latency": latency_summary(completed),
+        "latency_by_tool": {tool: latency_summary(values) for tool, values in latencies.items()},
+        "stages": await stage_saturation(db, run_start, wall),
+        "pipeline": pipeline,
+        "status_edits": status_editor.get_status(),
+        "api_calls": dict(client.calls),
+        "failures": [job for job in jobs if not job["ok"]][:20]
+    }
+
+    if args.mongo_uri and not args.keep_db:
+        await db.client.drop_database(db.db.name)
+    return results
+
+def print_results(results: dict):
+    jobs = results["jobs"]
+    throughput = results["throughput"]
+    print("\n" + "=" * 60)
+    print("📊 Load Test Results")
+    print("=" * 60)
+    print(f"Jobs: {jobs['completed']}/{jobs['total']} completed, {jobs['failed']} failed in {results['wall']:.1f}s")
+    print(
+        f"Throughput: {throughput['jobs_per_minute']:.1f} jobs/min | "
+        f"⬇️ {throughput['download_bytes_per_second'] / MB:.1f} MB/s | "
+        f"⬆️ {throughput['upload_bytes_per_second'] / MB:.1f} MB/s"
+    )
+
+    print(f"\n{'Latency (s)':<14} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    rows = [("all", results["latency"])] + sorted(results["latency_by_tool"].items())
+    for name, row in rows:
+        print(f"{name:<14} {row['count']:>5} {row['p50']:>8.2f} {row['p95']:>8.2f} {row['p99']:>8.2f} {row['max']:>8.2f}")
+
+    print(f"\n{'Stage':<14} {'spans':>6} {'busy s':>9} {'avg conc':>9} {'peak':>6} {'% job time':>11}")
+    for stage, row in sorted(results["stages"].items(), key=lambda item: -item[1]["busy"]):
+        print(
+            f"{stage:<14} {row['spans']:>6} {row['busy']:>9.1f} {row['avg_concurrency']:>9.2f} "
+            f"{row['peak_concurrency']:>6} {row['share_of_job_time'] * 100:>10.1f}%"
+        )
+
+    pipeline = results["pipeline"]
+    if pipeline:
+        print("\nPipeline (avg / max):")
+        for key, row in pipeline.items():
+            extra = f" ({row['utilization'] * 100:.0f}% of {results['environment']['ffmpeg_max_jobs']} slots)" \
+                if "utilization" in row else ""
+            print(f"• {key}: {row['avg']:.2f} / {row['max']}{extra}")
+
+    edits = results["status_edits"]
+    print(
+        f"\nStatus edits: sent {edits['sent']}, coalesced {edits['coalesced']}, "
+        f"dropped {edits['dropped']}, flood waits {edits['flood_waits']}"
+    )
+    if results["failed_by_tool"]:
+        print(f"\n❌ Failures by tool: {results['failed_by_tool']}")
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description="Load test the file handler with a fake Telegram client")
+    parser.add_argument("--users", type=int, default=10, help="concurrent simulated users")
+    parser.add_argument("--groups", type=int, default=2, help="authorized groups the users are spread across")
+    parser.add_argument("--jobs", type=int, default=3, help="jobs per user, run back to back")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted tool mix, e.g. encoding=3,sample=1")
+    parser.add_argument("--preset", default="480p", help="encoding preset for encoding jobs")
+    parser.add_argument("--media", action="append", default=[], help="video file to send (default: synthetic)")
+    parser.add_argument("--shared-inputs", action="store_true",
+                        help="reuse file_unique_ids so input and result caches can hit")
+    parser.add_argument("--download-speed", type=float, default=20, help="MB/s per download (0 = unlimited)")
+    parser.add_argument("--upload-speed", type=float, default=10, help="MB/s per upload (0 = unlimited)")
+    parser.add_argument("--link-download", type=float, default=0, help="aggregate download MB/s (0 = unlimited)")
+    parser.add_argument("--link-upload", type=float, default=0, help="aggregate upload MB/s (0 = unlimited)")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="seconds per Bot API call")
+    parser.add_argument("--db-latency", type=float, default=0.001, help="seconds per in-memory DB call")
+    parser.add_argument("--think", type=float, default=0, help="mean seconds between a user's jobs")
+    parser.add_argument("--ramp", type=float, default=5, help="users start spread over this many seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="pipeline sampling period")
+    parser.add_argument("--mongo-uri", help="use a local mongod instead of the in-memory database")
+    parser.add_argument("--keep-db", action="store_true", help="keep the temporary Mongo database")
+    parser.add_argument("--workdir", default=os.path.join(ROOT, "bench_data"), help="synthetic inputs and scratch")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    if args.users < 1 or args.groups < 1 or args.jobs < 1:
+        parser.error("--users, --groups and --jobs must be at least 1")
+    mix = parse_mix(args.mix)
+    for path in args.media:
+        if not os.path.exists(path):
+            parser.error(f"{path} not found")
+
+    sys.path.insert(0, ROOT)
+    from benchmark import generate_input
+
+    input_dir = os.path.join(args.workdir, "inputs")
+    os.makedirs(input_dir, exist_ok=True)
+    names = ["logo"] if args.media else ["360p_h264_10s", "720p_h264_30s", "logo"]
+    args.video_paths = {name: generate_input(name, input_dir) for name in names}
+
+    # Settings are read when config is first imported, so they must be in place before the bot loads
+    args.group_ids = [-1001000000000 - i for i in range(args.groups)]
+    os.environ["AUTHORIZED_GROUPS"] = ",".join(str(group_id) for group_id in args.group_ids)
+    os.environ["DOWNLOAD_DIR"] = tempfile.mkdtemp(prefix="load_", dir=args.workdir)
+    os.environ["METRICS_PORT"] = "0"
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+        os.environ["DATABASE_NAME"] = f"load_test_{int(time.time())}"
+
+    print(f"🚦 {args.users} users in {args.groups} groups, {args.jobs} jobs each, mix {mix}")
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(os.environ["DOWNLOAD_DIR"], ignore_errors=True)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"\n💾 Results written to {args.output}")
+    return results["jobs"]["failed"] == 0
+
+if __name__ == "__main__":
+    try:
+        sys.exit(0 if main() else 1)
+    except KeyboardInterrupt:
+        print("\n\nLoad test interrupted by user.")
+        sys.exit(1)